@@ -0,0 +1,215 @@
+"""
+stale-while-revalidate in-process cache
+"""
+import asyncio
+import sys
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+import numpy as np
+import pandas as pd
+from loguru import logger
+from .singleflight import SingleFlight
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+def nbytes(value: Any) -> int:
+    """approximate resident size of a cached value (frames and arrays by their buffers)"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(getattr(value, "nbytes", None), (int, np.integer)):
+        # ndarray, Series, Index and array containers such as PriceSeries
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ("value", "loader", "created", "soft_expiry", "hard_expiry", "next_refresh",
+                 "size", "cost", "hits", "priority")
+
+    def __init__(self, value, loader: Loader, created: float, soft_expiry: float, hard_expiry: float,
+                 size: int, cost: float):
+        self.value = value
+        self.created = created
+        self.loader = loader
+        self.soft_expiry = soft_expiry
+        self.hard_expiry = hard_expiry
+        self.next_refresh = soft_expiry
+        self.size = size
+        self.cost = cost      # seconds the loader took
+        self.hits = 1
+        self.priority = 0.0
+
+
+class SWRCache:
+    """
+    entries younger than soft_ttl are served as-is; between soft_ttl and hard_ttl they
+    are still served immediately while one background task refreshes them; an entry
+    is dropped only once it passes hard_ttl without a successful refresh
+    ttl_for(value), when given, sets the soft TTL per entry (e.g. from data the value
+    carries); the stale window hard_ttl - soft_ttl is kept after it
+
+    capacity is max_bytes of resident values (and optionally max_entries); past it the
+    entry with the lowest GreedyDual-Size-Frequency priority goes first, i.e. big, rarely
+    hit entries that were cheap to load are evicted before small, hot, expensive ones
+    """
+
+    def __init__(self, name: str, soft_ttl: float, hard_ttl: float, max_entries: int = None,
+                 refresh_retry: float = 30.0, ttl_for: Callable[[Any], float] = None,
+                 max_bytes: int = None, sizeof: Callable[[Any], int] = nbytes):
+        self.name = name
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl, soft_ttl)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.refresh_retry = refresh_retry
+        self.ttl_for = ttl_for
+        self.sizeof = sizeof
+        self.flight = SingleFlight(name)
+        self._entries = {}
+        self._refreshing = set()
+        self._clock = 0.0     # GDSF inflation: priority of the last evicted entry
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """cached value if it has not passed its hard TTL, without counting a hit"""
+        entry = self._entries.get(key)
+        if entry is None or time.time() >= entry.hard_expiry:
+            return None
+        return entry.value
+
+    def is_fresh(self, key: Hashable) -> bool:
+        """whether key holds a value that has not reached its soft TTL"""
+        entry = self._entries.get(key)
+        return entry is not None and time.time() < entry.soft_expiry
+
+    async def get(self, key: Hashable, loader: Loader,
+                  accept: Callable[[Any], bool] = None) -> Any:
+        """
+        return the cached value for key, loading it with loader on a miss
+        accept lets a caller reject a cached value that does not satisfy it (treated as a miss)
+        """
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and now >= entry.hard_expiry:
+            self._drop(key)
+            self.expirations += 1
+            entry = None
+        if entry is not None and (accept is None or accept(entry.value)):
+            self.hits += 1
+            entry.hits += 1
+            self._prioritize(entry)
+            if now >= entry.next_refresh:
+                self._revalidate(key, entry)
+            return entry.value
+
+        self.misses += 1
+        value = await self.flight.do(key, lambda: self._fill(key, loader))
+        if accept is not None and not accept(value):
+            # joined an in-flight load that was made for a different caller
+            value = await self._fill(key, loader)
+        return value
+
+    async def _fill(self, key: Hashable, loader: Loader) -> Any:
+        t0 = time.perf_counter()
+        value = await loader()
+        self.put(key, value, loader, cost=time.perf_counter() - t0)
+        return value
+
+    def put(self, key: Hashable, value: Any, loader: Loader, cost: float = 1.0, ttl: float = None,
+            age: float = 0.0):
+        """
+        store value for key; ttl overrides the soft TTL
+        age is how old the value already is (e.g. restored from disk): both TTLs count
+        from then, so it keeps its place in the stale window, and a value already past
+        its hard TTL is not stored at all
+        """
+        now = time.time()
+        created = now - max(age, 0.0)
+        if ttl is not None:
+            soft_ttl = max(ttl, 0.0)
+        else:
+            soft_ttl = self.soft_ttl if self.ttl_for is None else max(self.ttl_for(value), 0.0)
+        hard_ttl = soft_ttl + self.hard_ttl - self.soft_ttl
+        if created + hard_ttl <= now:
+            return
+        entry = _Entry(value, loader, created, created + soft_ttl, created + hard_ttl,
+                       max(self.sizeof(value), 1), cost)
+        old = self._drop(key)
+        if old is not None:
+            # a refresh keeps the popularity the key has earned
+            entry.hits = old.hits
+        self._prioritize(entry)
+        self._entries[key] = entry
+        self.resident_bytes += entry.size
+        self._evict(now, keep=key)
+
+    def _prioritize(self, entry: _Entry):
+        entry.priority = self._clock + entry.hits * entry.cost / entry.size
+
+    def _drop(self, key: Hashable) -> Optional[_Entry]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.resident_bytes -= entry.size
+        return entry
+
+    def _over_budget(self) -> bool:
+        return ((self.max_bytes is not None and self.resident_bytes > self.max_bytes)
+                or (self.max_entries is not None and len(self._entries) > self.max_entries))
+
+    def _evict(self, now: float, keep: Hashable = None):
+        # drop expired generations first, then the lowest-priority entries
+        for key in [k for k, e in self._entries.items() if now >= e.hard_expiry]:
+            self._drop(key)
+            self.expirations += 1
+        while self._over_budget() and len(self._entries) > 1:
+            key = min((k for k in self._entries if k != keep), key=lambda k: self._entries[k].priority)
+            self._clock = self._drop(key).priority
+            self.evictions += 1
+
+    def _revalidate(self, key: Hashable, entry: _Entry):
+        entry.next_refresh = time.time() + self.refresh_retry
+        task = asyncio.ensure_future(self.flight.do(key, lambda: self._refresh(key, entry)))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def _refresh(self, key: Hashable, entry: _Entry):
+        try:
+            return await self._fill(key, entry.loader)
+        except Exception as e:
+            logger.warning(
+                f"Background refresh of {self.name} cache failed for {key}, serving stale value: {e}")
+            return entry.value
+
+    def items(self):
+        """(key, value, seconds since it was stored) of every entry within its hard TTL"""
+        now = time.time()
+        return [(k, e.value, now - e.created) for k, e in list(self._entries.items()) if now < e.hard_expiry]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "resident_bytes": self.resident_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def clear(self):
+        self._entries.clear()
+        self.resident_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
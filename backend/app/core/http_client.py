@@ -0,0 +1,69 @@
+"""
+shared HTTP client and the thread pool upstream calls run on
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    import requests
+
+# one worker per pooled connection: the default executor (min(32, cpus + 4)
+# threads) is shared with file I/O and limiter waits and would cap concurrent
+# upstream requests below the pool size
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 32))
+
+_session = None
+_session_lock = threading.Lock()
+_io_pool = None
+
+
+def get_session() -> "requests.Session":
+    """
+    return the process-wide pooled HTTP session
+    connections are kept alive and reused across calls, so repeated FMP / Stooq
+    requests do not pay a new TCP + TLS handshake each time
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # requests is imported with the first upstream call, not at boot
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def close_session():
+    """close the pooled session (called on application shutdown)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+async def run_io(fn: Callable, *args):
+    """run a blocking upstream call or disk read on the dedicated I/O thread pool"""
+    global _io_pool
+    if _io_pool is None:
+        with _session_lock:
+            if _io_pool is None:
+                _io_pool = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="upstream")
+    return await asyncio.get_running_loop().run_in_executor(_io_pool, fn, *args)
+
+
+def shutdown_io_pool():
+    """stop the I/O thread pool (called on application shutdown)"""
+    global _io_pool
+    with _session_lock:
+        if _io_pool is not None:
+            _io_pool.shutdown(wait=False, cancel_futures=True)
+            _io_pool = None
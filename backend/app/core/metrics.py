@@ -0,0 +1,157 @@
+"""
+minimal Prometheus metrics (text exposition format 0.0.4)
+
+metrics are per process: with several uvicorn workers each one is scraped
+separately, as with the default prometheus_client registry
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Sequence
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_metrics = []
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """observe the wall time of the block (also when it raises)"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def register_collector(collect: Callable[[], Iterable[str]]):
+    """collect() returns exposition lines for values read at scrape time (e.g. gauges)"""
+    _collectors.append(collect)
+
+
+def gauge_lines(name: str, help: str, samples: Iterable[tuple], kind: str = "gauge",
+                labelnames: Sequence[str] = ()) -> List[str]:
+    """exposition lines for (label values, value) samples; None values are skipped"""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f"{name}{_labels(labelnames, labels)} {_number(value)}")
+    return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
+
+
+# pipeline stages of a request (price_fetch, signal_abc, serialization, ...)
+STAGE_SECONDS = Histogram(
+    "buynow_stage_seconds", "Time spent in each analysis pipeline stage", ("endpoint", "stage"))
+# upstream data providers
+PROVIDER_SECONDS = Histogram(
+    "buynow_provider_request_seconds", "Upstream provider call latency", ("provider",))
+PROVIDER_REQUESTS = Counter(
+    "buynow_provider_requests_total", "Upstream provider calls by outcome (ok, empty, error)",
+    ("provider", "outcome"))
+PROVIDER_FALLBACKS = Counter(
+    "buynow_provider_fallbacks_total",
+    "Providers started after the first one of a race, by reason (failure, hedge)", ("provider", "reason"))
+PROVIDER_RATE_LIMITED = Counter(
+    "buynow_provider_rate_limited_total", "Provider calls skipped for lack of a rate-limit token",
+    ("provider",))
+# post-close precompute job
+PRECOMPUTE_TICKERS = Counter(
+    "buynow_precompute_tickers_total", "Tickers processed by the precompute job, by outcome (ok, error)",
+    ("outcome",))
@@ -0,0 +1,169 @@
+"""
+per-provider token-bucket rate limiting, shared by every worker process on the host
+"""
+import asyncio
+import contextvars
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+from fastapi import HTTPException
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): buckets are only shared between threads of one process
+    fcntl = None
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# requests per minute when RATE_LIMIT_<PROVIDER> is not set; 0 disables the limit
+DEFAULT_RATES = {"FMP": 300, "yfinance": 120, "stooq": 60}
+
+_STATE = struct.Struct("dd")  # tokens, wall-clock time of the last update
+
+_priority = contextvars.ContextVar("provider_priority", default=INTERACTIVE)
+
+
+class RateLimited(HTTPException):
+    """no token could be had in time; surfaces as 429 with Retry-After"""
+
+    def __init__(self, provider: str, retry_after: float):
+        self.provider = provider
+        self.retry_after = retry_after
+        super().__init__(
+            status_code=429,
+            detail=f"Upstream rate limit for {provider}, retry in {math.ceil(retry_after)}s",
+            headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+        )
+
+
+@contextmanager
+def priority(level: str):
+    """run upstream calls made inside the block (and tasks started from it) at this priority"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """
+    token bucket whose state lives in a small file guarded by flock, so every
+    uvicorn worker on the host draws from the same quota
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, path: str):
+        self.name = name
+        self.rate = rate      # tokens per second
+        self.burst = burst
+        self.path = path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _state(self):
+        """locked read-modify-write of (tokens, refilled up to now)"""
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = os.pread(fd, _STATE.size, 0)
+                now = time.time()
+                tokens, stamp = _STATE.unpack(raw) if len(raw) == _STATE.size else (self.burst, now)
+                state = [min(self.burst, tokens + max(now - stamp, 0.0) * self.rate)]
+                yield state
+                os.pwrite(fd, _STATE.pack(state[0], now), 0)
+            finally:
+                os.close(fd)  # also releases the flock
+
+    def take(self, floor: float = 0.0, max_wait: Optional[float] = None) -> Tuple[bool, float]:
+        """
+        take one token, leaving at least `floor` tokens in the bucket
+        returns (taken, seconds until the token is usable); with max_wait set the token
+        may be reserved ahead (the bucket goes negative) if it is due within max_wait
+        """
+        with self._state() as state:
+            wait = (floor + 1 - state[0]) / self.rate
+            if wait <= 0 or (max_wait is not None and wait <= max_wait):
+                state[0] -= 1
+                return True, max(wait, 0.0)
+            return False, wait
+
+    def penalize(self, seconds: float):
+        """the provider answered 429: hold every worker off for `seconds`"""
+        with self._state() as state:
+            state[0] = min(state[0], 0.0) - seconds * self.rate
+
+
+class RateLimiter:
+    """
+    interactive calls reserve the next token and wait for it up to RATE_LIMIT_MAX_WAIT;
+    batch calls only take a token while RATE_LIMIT_RESERVE of the burst is left for
+    interactive traffic and poll up to RATE_LIMIT_BATCH_MAX_WAIT; past that RateLimited is raised
+    """
+
+    def __init__(self):
+        self.directory = os.getenv("RATE_LIMIT_DIR", os.path.join(tempfile.gettempdir(), "buynow-rate-limit"))
+        self.max_wait = float(os.getenv("RATE_LIMIT_MAX_WAIT", 2.0))
+        self.batch_max_wait = float(os.getenv("RATE_LIMIT_BATCH_MAX_WAIT", 30.0))
+        self.reserve = float(os.getenv("RATE_LIMIT_RESERVE", 0.25))
+        self.penalty = float(os.getenv("RATE_LIMIT_PENALTY", 15.0))
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str) -> Optional[TokenBucket]:
+        """bucket for a provider, or None if it is not limited"""
+        with self._lock:
+            if name not in self._buckets:
+                key = f"RATE_LIMIT_{name.upper()}"
+                per_minute = float(os.getenv(key, DEFAULT_RATES.get(name, 0)))
+                bucket = None
+                if per_minute > 0:
+                    burst = float(os.getenv(f"{key}_BURST", max(per_minute / 4, 1)))
+                    os.makedirs(self.directory, exist_ok=True)
+                    bucket = TokenBucket(name, per_minute / 60, burst,
+                                         os.path.join(self.directory, f"{name.lower()}.bucket"))
+                self._buckets[name] = bucket
+            return self._buckets[name]
+
+    async def acquire(self, name: str):
+        """wait for a token for provider `name` at the current priority, or raise RateLimited"""
+        bucket = self.bucket(name)
+        if bucket is None:
+            return
+        if _priority.get() != BATCH:
+            taken, wait = await asyncio.to_thread(bucket.take, 0.0, self.max_wait)
+            if not taken:
+                raise RateLimited(name, wait)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            return
+
+        deadline = time.monotonic() + self.batch_max_wait
+        floor = self.reserve * bucket.burst
+        while True:
+            taken, wait = await asyncio.to_thread(bucket.take, floor)
+            if taken:
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                raise RateLimited(name, wait)
+            await asyncio.sleep(wait)
+
+    def penalize(self, name: str):
+        bucket = self.bucket(name)
+        if bucket is not None:
+            bucket.penalize(self.penalty)
+
+
+def is_rate_limit_error(error_msg: str) -> bool:
+    return "429" in error_msg or "Too Many Requests" in error_msg or "Rate limit" in error_msg
+
+
+limiter = RateLimiter()
@@ -0,0 +1,44 @@
+"""
+single-flight request coalescing
+"""
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    concurrent callers with the same key share one in-flight call instead of each
+    going upstream; the call runs as its own task, so a cancelled caller does not
+    cancel the fetch the others are waiting on
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.leaders = 0      # calls that actually went upstream
+        self.collapsed = 0    # callers that joined an in-flight call
+        self._inflight = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.collapsed += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # mark the exception as retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._inflight),
+        }
@@ -1,26 +1,76 @@
 """
 FastAPI entry point
 """
-from loguru import logger
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from .routers import analysis
-import os
-from dotenv import load_dotenv
+import time
+# startup timing is measured from here, the first import uvicorn makes
+_BOOT = time.perf_counter()
+
+import asyncio  # noqa: E402
+from contextlib import asynccontextmanager  # noqa: E402
+from loguru import logger  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+import os  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+# Load environment variables from .env before modules that read configuration on import
+load_dotenv()
+
+from .routers import analysis, metrics  # noqa: E402
+from .core.http_client import close_session, shutdown_io_pool  # noqa: E402
+from .core.metrics import gauge_lines, register_collector  # noqa: E402
+from .services.batch import shutdown_compute_pool  # noqa: E402
+from . import precompute, snapshot  # noqa: E402
 
 # logging
-from .core.logging_config import setup_logging
+from .core.logging_config import setup_logging  # noqa: E402
 # initialize logging
 setup_logging()
 
-# Load environment variables from .env if present
-load_dotenv()
-
 logger.info("Starting BuyNow API")
+
+# seconds since _BOOT: imports, boot snapshot load, first response sent
+startup_seconds = {"import": time.perf_counter() - _BOOT}
+
+
+def _collect_startup():
+    yield from gauge_lines(
+        "buynow_startup_seconds", "Cold start timings of this worker process, from the first app import",
+        [((phase,), seconds) for phase, seconds in startup_seconds.items()], "gauge", ("phase",))
+
+
+register_collector(_collect_startup)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup / shutdown"""
+    t0 = time.perf_counter()
+    restored = snapshot.load()
+    startup_seconds["snapshot"] = time.perf_counter() - t0
+    startup_seconds["ready"] = time.perf_counter() - _BOOT
+    logger.info(
+        f"Startup: imports {startup_seconds['import']:.2f}s, boot snapshot {startup_seconds['snapshot']:.3f}s "
+        f"({restored.get('tickers', 0)} tickers, {restored.get('responses', 0)} responses), "
+        f"ready {startup_seconds['ready']:.2f}s")
+    # optional post-close precompute loop (one worker per host runs each pass)
+    scheduler = None
+    if os.getenv("PRECOMPUTE_SCHEDULE", "0").lower() in ("1", "true", "yes"):
+        scheduler = asyncio.create_task(precompute.run_forever())
+    yield
+    if scheduler is not None:
+        scheduler.cancel()
+    # release pooled upstream connections, I/O threads and compute workers
+    close_session()
+    shutdown_io_pool()
+    shutdown_compute_pool()
+
+
 app = FastAPI(
     title="Engineer Alpha API",
     description="Stock risk analysis and buy zone API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -32,8 +82,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+class FirstResponseTimer:
+    """report time-to-first-response once per process (a dict lookup afterwards)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or "first_response" in startup_seconds:
+            return await self.app(scope, receive, send)
+
+        async def send_timed(message):
+            await send(message)
+            if (message["type"] == "http.response.body" and not message.get("more_body")
+                    and "first_response" not in startup_seconds):
+                startup_seconds["first_response"] = time.perf_counter() - _BOOT
+                logger.info(f"First response ({scope['method']} {scope['path']}) "
+                            f"{startup_seconds['first_response']:.2f}s after boot")
+        await self.app(scope, receive, send_timed)
+
+
+app.add_middleware(FirstResponseTimer)
+
 # Register routes
 app.include_router(analysis.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
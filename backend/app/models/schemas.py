@@ -2,7 +2,7 @@
 Pydantic 数据模型
 """
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Annotated, Optional, Literal
 
 
 class AnalysisRequest(BaseModel):
@@ -85,3 +85,109 @@ class AnalysisResponse(BaseModel):
     fundamentals: FundamentalsResponse
     fair_value: FairValueResponse
     add_levels: AddLevelsResponse
+
+
+class BatchAnalysisRequest(BaseModel):
+    """批量分析请求模型"""
+    tickers: list[str] = Field(..., min_length=1, max_length=2000, description="股票代码列表",
+                               example=["MSFT", "AAPL"])
+    years: int = Field(10, ge=2, le=15, description="历史回看长度（年）")
+
+
+class BatchItemResponse(BaseModel):
+    """批量分析单个股票结果（成功时含信号/风险/区间，失败时含 error）"""
+    ticker: str
+    signal: Optional[SignalResponse] = None
+    risk: Optional[RiskResponse] = None
+    zones: Optional[ZonesResponse] = None
+    error: Optional[str] = None
+
+
+class BatchAnalysisResponse(BaseModel):
+    """批量分析响应模型"""
+    results: list[BatchItemResponse]
+
+
+class ScreenerRequest(BaseModel):
+    """选股请求模型：股票池 + 筛选条件（未设置的条件不生效）"""
+    tickers: list[str] = Field(..., min_length=1, max_length=5000, description="股票池")
+    years: int = Field(10, ge=2, le=15, description="历史回看长度（年）")
+    signals: Optional[list[str]] = Field(None, description="保留的信号，如 Building a Position")
+    min_risk_score: Optional[int] = Field(None, description="最低风险分数")
+    max_risk_score: Optional[int] = Field(None, description="最高风险分数")
+    max_pct3y: Optional[float] = Field(None, ge=0, le=1, description="3年分位上限")
+    max_pct5y: Optional[float] = Field(None, ge=0, le=1, description="5年分位上限")
+    max_rsi: Optional[float] = Field(None, ge=0, le=100, description="RSI 上限")
+    trend_up: Optional[bool] = Field(None, description="MA50 是否在 MA200 之上")
+
+
+class ScreenerRow(BaseModel):
+    """选股结果行"""
+    Ticker: str
+    Signal: str
+    Last: float
+    RSI: Optional[float]
+    Pct3Y: Optional[float]
+    Pct5Y: Optional[float]
+    A_pos: bool
+    B_rsi: bool
+    C_turn: bool
+    Risk: str
+    RiskScore: int
+    TrendUp: bool
+    MA50: Optional[float]
+    MA200: Optional[float]
+    Vol: Optional[float]
+    DD1Y: Optional[float]
+
+
+class ScreenerResponse(BaseModel):
+    """选股响应模型"""
+    scanned: int
+    matched: int
+    results: list[ScreenerRow]
+    errors: dict[str, str]
+
+
+class BacktestRequest(BaseModel):
+    """回测请求模型"""
+    ticker: str = Field(..., description="股票代码", example="MSFT")
+    years: int = Field(10, ge=2, le=15, description="历史回看长度（年）")
+    fill_window: int = Field(20, ge=1, le=252, description="加仓挂单有效天数")
+    # 每个观察期 1 ~ 3780 个交易日（最长回看期 15 年）
+    horizons: list[Annotated[int, Field(ge=1, le=15 * 252)]] = Field(
+        [20, 60, 120, 252], min_length=1, max_length=8, description="远期收益观察天数")
+
+
+class ForwardStats(BaseModel):
+    """远期收益统计"""
+    count: int
+    mean: Optional[float]
+    median: Optional[float]
+    win_rate: Optional[float]
+
+
+class SignalBacktest(BaseModel):
+    """单个信号状态的回测结果"""
+    days: int
+    forward: dict[int, ForwardStats]
+
+
+class EntryBacktest(BaseModel):
+    """单个加仓价位的回测结果"""
+    signals: int
+    fills: int
+    hit_rate: Optional[float]
+    forward: dict[int, ForwardStats]
+    lookahead: bool = Field(False, description="价位使用了当前估值（对历史日期含未来信息）")
+
+
+class BacktestResponse(BaseModel):
+    """回测响应模型"""
+    ticker: str
+    start: Optional[str]
+    end: Optional[str]
+    days: int
+    signals: dict[str, SignalBacktest]
+    entries: dict[str, EntryBacktest]
+    fair_value: FairValueResponse
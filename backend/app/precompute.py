@@ -0,0 +1,217 @@
+"""
+post-close precompute job: after each market close, walk the configured ticker
+universe, refresh prices and fundamentals through the regular loaders, run the
+/analyze pipeline (signal_abc, risk_level, buy_zones, rough_fair_value_range)
+and persist the finished responses in the result store, so requests for those
+tickers are lookups until the market opens again
+
+    python -m app.precompute [--loop] [TICKER ...]
+
+a run is keyed by market and session day; progress is saved after every ticker,
+so an interrupted run resumes with the tickers it had not finished
+inside the app, PRECOMPUTE_SCHEDULE=1 runs the same loop in the background; a
+host-wide lock lets one worker process run it while the others skip
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from dotenv import load_dotenv
+from loguru import logger
+
+# when run as a script, load .env before modules that read configuration on import
+load_dotenv()
+
+from .core.metrics import PRECOMPUTE_TICKERS  # noqa: E402
+from .core.rate_limit import BATCH, priority  # noqa: E402
+from .models.schemas import AnalysisRequest  # noqa: E402
+from .routers.analysis import analysis_result  # noqa: E402
+from .services import result_store  # noqa: E402
+from .services.fundamentals import load_fundamentals_bulk  # noqa: E402
+from .services.market_calendar import last_session_day, market_for, settle_end  # noqa: E402
+from .snapshot import SNAPSHOT_TICKERS  # noqa: E402
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): runs are only serialized within a process
+    fcntl = None
+
+PRECOMPUTE_DIR = Path(os.getenv(
+    "PRECOMPUTE_DIR",
+    str(Path(__file__).resolve().parent / "data" / "precompute")
+))
+PRECOMPUTE_CONCURRENCY = int(os.getenv("PRECOMPUTE_CONCURRENCY", 4))
+# wait after a market's settle window ends before starting its run (seconds)
+PRECOMPUTE_DELAY = float(os.getenv("PRECOMPUTE_DELAY", 300))
+# retry interval when another process holds the run lock or a run failed (seconds)
+PRECOMPUTE_RETRY = float(os.getenv("PRECOMPUTE_RETRY", 900))
+# tickers on markets without a known calendar
+_OTHER = "other"
+
+
+def universe() -> list:
+    """tickers to precompute: PRECOMPUTE_TICKERS, else PRECOMPUTE_UNIVERSE_FILE, else SNAPSHOT_TICKERS"""
+    tickers = [t.strip() for t in os.getenv("PRECOMPUTE_TICKERS", "").split(",") if t.strip()]
+    path = os.getenv("PRECOMPUTE_UNIVERSE_FILE")
+    if not tickers and path:
+        with open(path) as fh:
+            tickers = [line.split("#")[0].strip() for line in fh]
+    return list(dict.fromkeys(t.upper() for t in tickers if t)) or SNAPSHOT_TICKERS
+
+
+def _by_market(tickers: list) -> dict:
+    groups = {}
+    for ticker in tickers:
+        market = market_for(ticker)
+        groups.setdefault(market.name if market else _OTHER, []).append(ticker)
+    return groups
+
+
+def _run_id(market: str, tickers: list) -> str:
+    """market and the session whose bars the run covers (UTC date without a calendar)"""
+    day = last_session_day(tickers[0]) if market != _OTHER else None
+    return f"{market}:{day or datetime.now(timezone.utc).date()}"
+
+
+def _progress_path(market: str) -> Path:
+    return PRECOMPUTE_DIR / f"progress-{market}.json"
+
+
+def _load_progress(market: str, run_id: str) -> dict:
+    try:
+        with open(_progress_path(market)) as fh:
+            progress = json.load(fh)
+        if progress.get("run") == run_id:
+            return progress
+    except (FileNotFoundError, ValueError):
+        pass
+    return {"run": run_id, "done": [], "failed": {}}
+
+
+def _save_progress(market: str, progress: dict):
+    path = _progress_path(market)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(progress, fh)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _exclusive():
+    """host-wide run lock; yields False when another process holds it"""
+    PRECOMPUTE_DIR.mkdir(parents=True, exist_ok=True)
+    fd = os.open(PRECOMPUTE_DIR / ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+        yield True
+    finally:
+        os.close(fd)  # also releases the flock
+
+
+async def _run_market(market: str, tickers: list) -> dict:
+    progress = _load_progress(market, _run_id(market, tickers))
+    done = set(progress["done"])
+    pending = [t for t in tickers if t not in done]
+    if not pending:
+        return progress
+    logger.info(f"Precomputing {len(pending)} of {len(tickers)} {market} tickers for run {progress['run']}")
+
+    semaphore = asyncio.Semaphore(PRECOMPUTE_CONCURRENCY)
+
+    async def one(ticker: str):
+        async with semaphore:
+            try:
+                # a stale history would be served as-is and only refreshed in the
+                # background, storing results for the previous session's bars
+                key, cached, _ = await analysis_result(AnalysisRequest(ticker=ticker), fresh=True)
+                await asyncio.to_thread(result_store.write, key, cached.snapshot, cached.body, cached.etag)
+            except Exception as e:
+                progress["failed"][ticker] = str(getattr(e, "detail", e))
+                PRECOMPUTE_TICKERS.inc(outcome="error")
+                logger.warning(f"Precompute failed for {ticker}: {progress['failed'][ticker]}")
+            else:
+                progress["done"].append(ticker)
+                progress["failed"].pop(ticker, None)
+                PRECOMPUTE_TICKERS.inc(outcome="ok")
+            _save_progress(market, progress)
+
+    with priority(BATCH):
+        # quotes for the whole group in a few batch requests instead of one per ticker
+        await load_fundamentals_bulk(pending, concurrency=PRECOMPUTE_CONCURRENCY)
+        await asyncio.gather(*(one(t) for t in pending))
+    return progress
+
+
+async def run(tickers: list = None):
+    """
+    one pass over the universe, resuming each market's run where it stopped
+    returns {market: progress}, or None when another process is running it
+    """
+    tickers = tickers or universe()
+    with _exclusive() as acquired:
+        if not acquired:
+            logger.info("Precompute already running in another process, skipped")
+            return None
+        t0 = time.perf_counter()
+        result = {m: await _run_market(m, group) for m, group in _by_market(tickers).items()}
+    done = sum(len(p["done"]) for p in result.values())
+    failed = sum(len(p["failed"]) for p in result.values())
+    logger.info(f"Precompute pass finished in {time.perf_counter() - t0:.1f}s: {done} done, {failed} failed")
+    return result
+
+
+def _next_run(tickers: list) -> float:
+    """epoch seconds of the next post-close run: the earliest settle end among the markets"""
+    now = time.time()
+    wakes = []
+    for market, group in _by_market(tickers).items():
+        end = settle_end(group[0], now) if market != _OTHER else None
+        if end is None:
+            # no calendar: once a day, after UTC midnight
+            end = (datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+                   + timedelta(days=1)).timestamp()
+        wakes.append(end + PRECOMPUTE_DELAY)
+    return min(wakes)
+
+
+async def run_forever(tickers: list = None):
+    """catch up on the latest session, then run again after every close"""
+    tickers = tickers or universe()
+    while True:
+        try:
+            result = await run(tickers)
+            retry = result is None or any(p["failed"] for p in result.values())
+        except Exception as e:
+            logger.error(f"Precompute pass failed: {e}")
+            retry = True
+        wake = _next_run(tickers)
+        if retry:
+            wake = min(wake, time.time() + PRECOMPUTE_RETRY)
+        await asyncio.sleep(max(wake - time.time(), 1.0))
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.precompute", description=__doc__.split("\n\n")[0])
+    parser.add_argument("tickers", nargs="*", help="tickers to precompute (default: the configured universe)")
+    parser.add_argument("--loop", action="store_true", help="keep running after every market close")
+    args = parser.parse_args(argv)
+    tickers = [t.upper() for t in args.tickers] or None
+    if args.loop:
+        asyncio.run(run_forever(tickers))
+        return 0
+    result = asyncio.run(run(tickers))
+    return 0 if result is not None and not any(p["failed"] for p in result.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,35 +1,145 @@
 """
 分析 API 路由
 """
+import asyncio
+import hashlib
+import os
+from typing import Literal, NamedTuple, Optional
 from loguru import logger
-from fastapi import APIRouter, HTTPException
-import pandas as pd
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 from ..models.schemas import AnalysisRequest, AnalysisResponse, SignalResponse, RiskResponse, ZonesResponse, FundamentalsResponse, FairValueResponse, AddLevelsResponse
-from ..services.data_loader import load_price
+from ..models.schemas import BatchAnalysisRequest, BatchAnalysisResponse, BatchItemResponse
+from ..models.schemas import ScreenerRequest, ScreenerResponse, BacktestRequest, BacktestResponse
+from ..services.data_loader import DATA_CACHE_TTL, WINDOW_MARGIN_DAYS, load_price_async, history_start
+from ..services.data_loader import price_fresh_for, window_start
+from ..services import result_store
+from ..services.batch import analyze_batch
+from ..services.screener import run_screener
+from ..services.backtest import run_backtest
+from ..services.indicator_state import window_indicators
 from ..services.signals import signal_abc
 from ..services.risk import risk_level
 from ..services.zones import buy_zones, add_levels
-from ..services.fundamentals import get_fundamentals, rough_fair_value_range
-from ..core.logging_config import setup_logging
-setup_logging()
-logger.add("logs/analysis.log", backtrace=True, diagnose=True)
+from ..services.fundamentals import fundamentals_cache, get_fundamentals_async, reprice, rough_fair_value_range
+from ..core.cache import SWRCache
+from ..core.http_client import run_io
+from ..core.metrics import STAGE_SECONDS
 
 
 router = APIRouter(prefix="/api/v1", tags=["analysis"])
 
 
-@router.post("/analyze", response_model=AnalysisResponse)
-async def analyze_stock(request: AnalysisRequest):
+class _CachedResponse(NamedTuple):
+    snapshot: dict      # fundamentals snapshot the response was built from
+    body: bytes
+    etag: str
+
+
+# finished /analyze responses; keys carry the last bar, so entries never go stale and
+# the TTL and byte budget only bound memory
+_RESPONSE_TTL = float(os.getenv("ANALYZE_CACHE_TTL", 86400))
+response_cache = SWRCache(
+    "response",
+    soft_ttl=_RESPONSE_TTL,
+    hard_ttl=_RESPONSE_TTL,
+    max_bytes=int(os.getenv("ANALYZE_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+    sizeof=lambda r: len(r.body) + len(r.etag),
+)
+
+# Cache-Control max-age while the ticker's market can change a bar; outside sessions
+# it runs until the next open, at most ANALYZE_CACHE_MAX_AGE_CLOSED
+ANALYZE_CACHE_MAX_AGE = int(os.getenv("ANALYZE_CACHE_MAX_AGE", os.getenv("DATA_CACHE_TTL", 900)))
+ANALYZE_CACHE_MAX_AGE_CLOSED = int(os.getenv("ANALYZE_CACHE_MAX_AGE_CLOSED", 86400))
+ANALYZE_CACHE_STALE = int(os.getenv("ANALYZE_CACHE_STALE", 60))
+
+
+def _ticker(ticker: str) -> str:
+    """canonical symbol, so "msft " and "MSFT" share one cache, state and store entry"""
+    return ticker.strip().upper()
+
+
+def _etag(body: bytes) -> str:
+    """strong ETag: a digest of the exact bytes, identical across workers"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _prefetch(coro) -> asyncio.Task:
+    """start coro now; its error is marked retrieved in case the handler never awaits it"""
+    task = asyncio.ensure_future(coro)
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
+
+
+async def _timed(coro, endpoint: str, stage: str):
+    with STAGE_SECONDS.time(endpoint=endpoint, stage=stage):
+        return await coro
+
+
+def cached_responses() -> list:
+    """(key, fundamentals snapshot, body, etag) of every cached /analyze response"""
+    return [(key, r.snapshot, r.body, r.etag) for key, r, _ in response_cache.items()]
+
+
+def seed_response(key: tuple, snapshot: dict, body: bytes, etag: str):
     """
-    analyze stock: generate signal, risk, buy zones, etc.
+    restore a finished response into the cache (boot snapshot); it is only served
+    while the fundamentals cache holds that same snapshot object
+    """
+    cached = _CachedResponse(snapshot, body, etag)
+
+    async def reload():
+        return cached
+    response_cache.put(key, cached, reload)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _cache_control(ticker: str, df) -> str:
+    fresh_for = price_fresh_for(ticker, df)
+    max_age = ANALYZE_CACHE_MAX_AGE
+    if fresh_for > DATA_CACHE_TTL:
+        max_age = min(int(fresh_for), ANALYZE_CACHE_MAX_AGE_CLOSED)
+    return f"public, max-age={max_age}, stale-while-revalidate={ANALYZE_CACHE_STALE}"
+
+
+def _respond(cached: _CachedResponse, cache_control: str, if_none_match: Optional[str] = None) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": cache_control}
+    if _etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+async def analysis_result(request: AnalysisRequest, fresh: bool = False) -> tuple:
+    """
+    (key, cached response, price window) for an analysis request: served from the
+    response cache or the precomputed results when the inputs match, else computed
+    fresh=True never uses a stale price history (it waits for the refresh)
     """
+    # fundamentals (quote/info + cash flow) are fetched in the background while
+    # prices load and the technicals run; they are only awaited for the fair value
+    fundamentals = _prefetch(_timed(get_fundamentals_async(request.ticker), "analyze", "fundamentals_fetch"))
     try:
-        # calculate start date
-        start = (pd.Timestamp.today(tz="UTC") -
-                 pd.Timedelta(days=365 * request.years)).date().isoformat()
+        # calculate start date: a margin before today's look-back, so the window can be
+        # cut back from the last bar and only moves with a new bar, not with the date
+        start = history_start(request.years, WINDOW_MARGIN_DAYS)
 
         # load price data
-        df = load_price(request.ticker, start)
+        with STAGE_SECONDS.time(endpoint="analyze", stage="price_fetch"):
+            df = await load_price_async(request.ticker, start, fresh)
+            if df is not None and not df.empty:
+                first = window_start(df, request.years)
+                if first < start:
+                    # last bar older than the margin (e.g. a halted ticker)
+                    df = await load_price_async(request.ticker, first, fresh)
+        if df is not None and not df.empty:
+            df = df.slice_from(first)
 
         # check if data is available
         if (
@@ -40,33 +150,67 @@ async def analyze_stock(request: AnalysisRequest):
             or (hasattr(df["Close"], "__len__") and len(df["Close"]) < 260)
         ):
             logger.error(
-                f"Data not available for {request.ticker}: {df.head() if df is not None else 'No data'}")
+                f"Data not available for {request.ticker}: {df if df is not None else 'No data'}")
             raise HTTPException(
                 status_code=400,
                 detail="data not enough or failed to load"
             )
 
-        # core calculation
-        sig = signal_abc(df)
-        risk = risk_level(df)
-        zones = buy_zones(df)
-
-        # fundamentals analysis
-        f = get_fundamentals(request.ticker)
-        fair = rough_fair_value_range(f)
-
-        # add levels
-        adds = add_levels(sig["Last"], zones, fair)
-
-        # build response
-        return AnalysisResponse(
-            signal=SignalResponse(**sig),
-            risk=RiskResponse(**risk),
-            zones=ZonesResponse(**zones),
-            fundamentals=FundamentalsResponse(**f),
-            fair_value=FairValueResponse(**fair),
-            add_levels=AddLevelsResponse(**adds)
-        )
+        # the response only changes with the bars in the window (a new or revised last bar)
+        # or a new fundamentals snapshot; the snapshot is matched by identity, the
+        # fundamentals cache replaces it on refresh
+        key = (request.ticker, request.years, request.mode,
+               int(df.days[0]), int(df.days[-1]), float(df["Close"][-1]))
+
+        async def compute() -> _CachedResponse:
+            # precomputed after the close from the same bars and equal fundamentals
+            stored = await run_io(result_store.read, key)
+            if stored is not None:
+                with STAGE_SECONDS.time(endpoint="analyze", stage="fundamentals_wait"):
+                    snapshot = await fundamentals
+                if stored["fundamentals"] == snapshot:
+                    return _CachedResponse(snapshot, stored["body"].encode(), stored["etag"])
+
+            # core calculation (indicators computed once, shared by all three); the
+            # per-window state only folds in the bars that entered or left the window
+            with STAGE_SECONDS.time(endpoint="analyze", stage="compute_indicators"):
+                ind = window_indicators((request.ticker, request.years), df)
+            with STAGE_SECONDS.time(endpoint="analyze", stage="signal_abc"):
+                sig = signal_abc(df, ind)
+            with STAGE_SECONDS.time(endpoint="analyze", stage="risk_level"):
+                risk = risk_level(df, ind)
+            with STAGE_SECONDS.time(endpoint="analyze", stage="buy_zones"):
+                zones = buy_zones(df, ind)
+
+            # fundamentals analysis (cached snapshot, price-derived fields from the latest close)
+            with STAGE_SECONDS.time(endpoint="analyze", stage="fundamentals_wait"):
+                snapshot = await fundamentals
+            f = reprice(snapshot, sig["Last"])
+            with STAGE_SECONDS.time(endpoint="analyze", stage="rough_fair_value_range"):
+                fair = rough_fair_value_range(f)
+
+            # add levels
+            adds = add_levels(sig["Last"], zones, fair)
+
+            # build and serialize the response here (instead of letting FastAPI re-validate
+            # it against response_model) so serialization shows up as its own stage
+            with STAGE_SECONDS.time(endpoint="analyze", stage="serialization"):
+                body = AnalysisResponse(
+                    signal=SignalResponse(**sig),
+                    risk=RiskResponse(**risk),
+                    zones=ZonesResponse(**zones),
+                    fundamentals=FundamentalsResponse(**f),
+                    fair_value=FairValueResponse(**fair),
+                    add_levels=AddLevelsResponse(**adds)
+                ).model_dump_json().encode()
+            return _CachedResponse(snapshot, body, _etag(body))
+
+        cached = await response_cache.get(
+            key, compute, accept=lambda r: r.snapshot is fundamentals_cache.peek(request.ticker))
+        if not fundamentals.done():
+            # served from cache: still let the snapshot lookup run so a stale one gets refreshed
+            await fundamentals
+        return key, cached, df
 
     except HTTPException:
         raise
@@ -75,3 +219,96 @@ async def analyze_stock(request: AnalysisRequest):
             status_code=500,
             detail=f"error during analysis: {str(e)}"
         )
+    finally:
+        # no-op once awaited; if the price path failed first the cache fill itself keeps running
+        fundamentals.cancel()
+
+
+async def run_analysis(request: AnalysisRequest, if_none_match: Optional[str] = None) -> Response:
+    _, cached, df = await analysis_result(request)
+    return _respond(cached, _cache_control(request.ticker, df), if_none_match)
+
+
+@router.post("/analyze", response_model=AnalysisResponse)
+async def analyze_stock(request: AnalysisRequest):
+    """
+    analyze stock: generate signal, risk, buy zones, etc.
+    """
+    request.ticker = _ticker(request.ticker)
+    return await run_analysis(request)
+
+
+@router.get("/analyze/{ticker}", response_model=AnalysisResponse)
+async def analyze_stock_get(
+    ticker: str,
+    years: int = Query(10, ge=2, le=15),
+    mode: Literal["conservative", "standard", "aggressive"] = "standard",
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    same as POST /analyze, as a cacheable GET: answers If-None-Match with 304 and
+    sets Cache-Control so a CDN can serve repeat requests
+    """
+    return await run_analysis(AnalysisRequest(ticker=_ticker(ticker), years=years, mode=mode), if_none_match)
+
+
+@router.post("/analyze/batch", response_model=BatchAnalysisResponse)
+async def analyze_stock_batch(request: BatchAnalysisRequest):
+    """
+    analyze a watchlist: signal, risk and buy zones per ticker
+    a ticker that fails is reported in its own entry instead of failing the batch
+    """
+    with STAGE_SECONDS.time(endpoint="analyze_batch", stage="total"):
+        results = await analyze_batch([_ticker(t) for t in request.tickers], request.years)
+    return BatchAnalysisResponse(results=[BatchItemResponse(**r) for r in results])
+
+
+@router.post("/screener", response_model=ScreenerResponse)
+async def screen_stocks(request: ScreenerRequest):
+    """
+    screen a ticker universe: signal and risk for every ticker computed at once
+    on an aligned price matrix, then filtered
+    """
+    filters = request.model_dump(exclude={"tickers", "years"})
+    with STAGE_SECONDS.time(endpoint="screener", stage="total"):
+        result = await run_screener([_ticker(t) for t in request.tickers], request.years, **filters)
+    return ScreenerResponse(**result)
+
+
+@router.post("/backtest", response_model=BacktestResponse)
+async def backtest_stock(request: BacktestRequest):
+    """
+    backtest the ABC signal and the staged add levels over the whole history
+    ValuePocketAdd uses today's fundamentals for every day (historical snapshots are not available)
+    """
+    request.ticker = _ticker(request.ticker)
+    fundamentals = _prefetch(_timed(get_fundamentals_async(request.ticker), "backtest", "fundamentals_fetch"))
+    try:
+        with STAGE_SECONDS.time(endpoint="backtest", stage="price_fetch"):
+            df = await load_price_async(request.ticker, history_start(request.years))
+        if df is None or "Close" not in df or len(df) < 260:
+            raise HTTPException(
+                status_code=400,
+                detail="data not enough or failed to load"
+            )
+
+        try:
+            fair = rough_fair_value_range(reprice(await fundamentals, df["Close"][-1]))
+        except Exception as e:
+            logger.warning(f"Fundamentals unavailable for backtest of {request.ticker}: {e}")
+            fair = {"Method": "N/A", "FairLow": None, "FairMid": None, "FairHigh": None}
+
+        horizons = sorted(set(request.horizons))
+        with STAGE_SECONDS.time(endpoint="backtest", stage="run_backtest"):
+            result = await asyncio.to_thread(run_backtest, df, fair, request.fill_window, horizons)
+        return BacktestResponse(ticker=request.ticker, fair_value=FairValueResponse(**fair), **result)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"error during backtest: {str(e)}"
+        )
+    finally:
+        fundamentals.cancel()
@@ -0,0 +1,61 @@
+"""
+Prometheus metrics endpoint
+"""
+from fastapi import APIRouter, Response
+from ..core import metrics
+from ..services.data_loader import price_cache
+from ..services.fundamentals import fundamentals_cache
+from ..services.providers import scheduler
+from .analysis import response_cache
+
+router = APIRouter(tags=["metrics"])
+
+CACHES = (price_cache, fundamentals_cache, response_cache)
+
+
+def _collect_caches():
+    stats = [(cache.name, cache.stats(), cache.flight.stats()) for cache in CACHES]
+    yield from metrics.gauge_lines(
+        "buynow_cache_hits_total", "Cache lookups served from memory (fresh or stale)",
+        [((name,), s["hits"]) for name, s, _ in stats], "counter", ("cache",))
+    yield from metrics.gauge_lines(
+        "buynow_cache_misses_total", "Cache lookups that had to load",
+        [((name,), s["misses"]) for name, s, _ in stats], "counter", ("cache",))
+    yield from metrics.gauge_lines(
+        "buynow_cache_hit_ratio", "hits / (hits + misses) since start",
+        [((name,), s["hit_ratio"]) for name, s, _ in stats], "gauge", ("cache",))
+    yield from metrics.gauge_lines(
+        "buynow_cache_evictions_total", "Entries evicted to stay within the byte budget",
+        [((name,), s["evictions"]) for name, s, _ in stats], "counter", ("cache",))
+    yield from metrics.gauge_lines(
+        "buynow_cache_resident_bytes", "Bytes held by cached values",
+        [((name,), s["resident_bytes"]) for name, s, _ in stats], "gauge", ("cache",))
+    yield from metrics.gauge_lines(
+        "buynow_cache_entries", "Entries currently cached",
+        [((name,), s["entries"]) for name, s, _ in stats], "gauge", ("cache",))
+    yield from metrics.gauge_lines(
+        "buynow_cache_collapsed_loads_total", "Loads that joined an in-flight load for the same key",
+        [((name,), f["collapsed"]) for name, _, f in stats], "counter", ("cache",))
+
+
+def _collect_providers():
+    snapshot = scheduler.snapshot()
+    yield from metrics.gauge_lines(
+        "buynow_provider_circuit_open", "1 while the provider's circuit breaker is open",
+        [((name,), float(s["circuit_open"])) for name, s in snapshot.items()], "gauge", ("provider",))
+    yield from metrics.gauge_lines(
+        "buynow_provider_error_rate", "Error rate over the rolling stats window",
+        [((name,), s["error_rate"]) for name, s in snapshot.items()], "gauge", ("provider",))
+    yield from metrics.gauge_lines(
+        "buynow_provider_latency_p95_seconds", "p95 latency over the rolling stats window (used as hedge delay)",
+        [((name,), s["p95"]) for name, s in snapshot.items()], "gauge", ("provider",))
+
+
+metrics.register_collector(_collect_caches)
+metrics.register_collector(_collect_providers)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """metrics of this worker process in Prometheus text format"""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
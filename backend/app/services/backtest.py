@@ -0,0 +1,138 @@
+"""
+回测引擎：逐日 ABC 信号、风险分数与买入区间的向量化计算，以及分批加仓模拟
+"""
+import numpy as np
+import pandas as pd
+from .indicators import compute_indicator_series, _values
+from .signals import signal_abc_arrays
+from .risk import risk_level_arrays
+from .zones import zone_bands, add_levels
+from ..utils.formatters import safe_float
+
+DEFAULT_HORIZONS = (20, 60, 120, 252)
+ENTRY_SIGNALS = ("Probing", "Building a Position", "Adding to a Position")
+STAGES = ("FirstAdd", "PullbackAdd", "ValuePocketAdd")
+# 用当前估值回推到所有历史日期的价位（含未来信息），结果单独标记
+LOOKAHEAD_STAGES = ("ValuePocketAdd",)
+
+
+def backtest_frame(df, fair: dict = None) -> pd.DataFrame:
+    """
+    每个交易日的信号状态、风险分数和加仓价位（只用当天及之前的数据）
+    fair: 估值区间（rough_fair_value_range 的结果），用于 ValuePocketAdd；
+    历史估值不可得，因此该价位对所有日期相同
+    """
+    s = compute_indicator_series(df)
+    sig, A, B, C = signal_abc_arrays(
+        s["Pct3Y"].to_numpy(), s["Pct5Y"].to_numpy(), s["RSI"].to_numpy(), s["RSITurnUp"].to_numpy())
+    trend_up = (s["MA50"] > s["MA200"]).to_numpy()
+    score, risk = risk_level_arrays(s["Vol"].to_numpy(), s["DD1Y"].to_numpy(), trend_up)
+    bands = zone_bands(s["Last"].to_numpy(), s["ATR14"].to_numpy(), s["MA200"].to_numpy())
+    levels = add_levels(None, bands, fair or {})
+    value_pocket = levels["ValuePocketAdd"]
+
+    return pd.DataFrame({
+        "Close": s["Last"],
+        "Signal": sig,
+        "A_pos": A,
+        "B_rsi": B,
+        "C_turn": C,
+        "RiskScore": score,
+        "Risk": risk,
+        "NeutralLow": bands["Neutral"][0],
+        "NeutralHigh": bands["Neutral"][1],
+        "AggressiveLow": bands["Aggressive"][0],
+        "AggressiveHigh": bands["Aggressive"][1],
+        "FirstAdd": levels["FirstAdd"],
+        "PullbackAdd": levels["PullbackAdd"],
+        "ValuePocketAdd": value_pocket if value_pocket is not None else np.nan,
+    }, index=s.index)
+
+
+def _forward_stats(rets: np.ndarray) -> dict:
+    rets = rets[~np.isnan(rets)]
+    if len(rets) == 0:
+        return {"count": 0, "mean": None, "median": None, "win_rate": None}
+    return {
+        "count": int(len(rets)),
+        "mean": safe_float(rets.mean()),
+        "median": safe_float(np.median(rets)),
+        "win_rate": safe_float((rets > 0).mean()),
+    }
+
+
+def _forward_returns(close: np.ndarray, idx: np.ndarray, base: np.ndarray, h: int) -> np.ndarray:
+    """close[idx + h] / base - 1，超出历史（或 h 非正）的为 NaN"""
+    j = idx + h
+    ok = (j >= 0) & (j < len(close)) & (h > 0)
+    out = np.full(len(idx), np.nan)
+    out[ok] = close[j[ok]] / base[ok] - 1
+    return out
+
+
+def _simulate_stage(level: np.ndarray, eligible: np.ndarray, low: np.ndarray, open_: np.ndarray,
+                    close: np.ndarray, fill_window: int, horizons) -> dict:
+    """
+    第 t 天收盘后以 level[t] 挂限价单，之后 fill_window 天内最低价触及即成交
+    （开盘价已低于限价时按开盘价成交），统计成交率与成交后的远期收益
+    """
+    n = len(close)
+    valid = eligible & np.isfinite(level)
+    # lows[t] = 第 t+1 .. t+fill_window 天的最低价
+    padded = np.concatenate((low[1:], np.full(fill_window, np.inf)))
+    lows = np.lib.stride_tricks.sliding_window_view(padded, fill_window)[:n]
+    hit = lows <= level[:, None]
+    filled = valid & hit.any(axis=1)
+
+    t = np.flatnonzero(filled)
+    fill_idx = t + 1 + hit[t].argmax(axis=1)
+    fill_price = np.fmin(level[t], open_[fill_idx])
+
+    signals = int(valid.sum())
+    return {
+        "signals": signals,
+        "fills": int(len(t)),
+        "hit_rate": len(t) / signals if signals else None,
+        "forward": {h: _forward_stats(_forward_returns(close, fill_idx, fill_price, h)) for h in horizons},
+    }
+
+
+def run_backtest(df, fair: dict = None, fill_window: int = 20,
+                 horizons=DEFAULT_HORIZONS, entry_signals=ENTRY_SIGNALS) -> dict:
+    """
+    回测（df 为 DataFrame 或 PriceSeries）：
+    signals: 各信号状态出现后的收盘价远期收益
+    entries: 在 entry_signals 出现的日子按 FirstAdd / PullbackAdd / ValuePocketAdd 挂单的成交率与远期收益，
+    ValuePocketAdd 使用今天的估值，带 lookahead 标记
+    """
+    bt = backtest_frame(df, fair)
+    close = bt["Close"].to_numpy()
+    # 与 bt 对齐：只保留 Close 非空的交易日
+    valid = ~np.isnan(_values(df, "Close"))
+    low = _values(df, "Low")[valid]
+    open_ = _values(df, "Open")[valid] if "Open" in df else np.full(len(bt), np.nan)
+    sig = bt["Signal"].to_numpy()
+    all_idx = np.arange(len(bt))
+
+    signals = {}
+    for name in np.unique(sig):
+        idx = all_idx[sig == name]
+        signals[str(name)] = {
+            "days": int(len(idx)),
+            "forward": {h: _forward_stats(_forward_returns(close, idx, close[idx], h)) for h in horizons},
+        }
+
+    eligible = np.isin(sig, entry_signals)
+    entries = {
+        stage: {**_simulate_stage(bt[stage].to_numpy(dtype=float), eligible, low, open_, close, fill_window, horizons),
+                "lookahead": stage in LOOKAHEAD_STAGES}
+        for stage in STAGES
+    }
+
+    return {
+        "start": bt.index[0].date().isoformat() if len(bt) else None,
+        "end": bt.index[-1].date().isoformat() if len(bt) else None,
+        "days": int(len(bt)),
+        "signals": signals,
+        "entries": entries,
+    }
@@ -0,0 +1,76 @@
+"""
+batch (watchlist) analysis
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from loguru import logger
+from ..core.rate_limit import BATCH, priority
+from .data_loader import load_price_async, history_start
+from .indicators import compute_indicators
+from .signals import signal_abc
+from .risk import risk_level
+from .zones import buy_zones
+
+_pool = None
+
+
+def get_compute_pool() -> ProcessPoolExecutor:
+    """process pool for CPU-bound indicator work, created on first use"""
+    global _pool
+    if _pool is None:
+        workers = int(os.getenv("COMPUTE_WORKERS", os.cpu_count() or 1))
+        # spawn: the API process runs threads (loguru, asyncio.to_thread) that must not be forked
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_compute_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def technical_analysis(df) -> dict:
+    """signal / risk / zones for one price history (runs inside a pool worker)"""
+    ind = compute_indicators(df)
+    return {
+        "signal": signal_abc(df, ind),
+        "risk": risk_level(df, ind),
+        "zones": buy_zones(df, ind),
+    }
+
+
+async def analyze_batch(tickers: list, years: int) -> list:
+    """
+    analyze many tickers: prices are fetched with bounded concurrency and the
+    indicator work is fanned out to the process pool
+    each result is either {"ticker", "signal", "risk", "zones"} or {"ticker", "error"}
+    """
+    start = history_start(years)
+    semaphore = asyncio.Semaphore(int(os.getenv("BATCH_FETCH_CONCURRENCY", 8)))
+    loop = asyncio.get_running_loop()
+    pool = get_compute_pool()
+
+    async def analyze_one(ticker: str) -> dict:
+        try:
+            async with semaphore:
+                df = await load_price_async(ticker, start)
+            if df is None or "Close" not in df or len(df) < 260:
+                return {"ticker": ticker, "error": "data not enough or failed to load"}
+            # the compact PriceSeries is what gets pickled to the worker
+            result = await loop.run_in_executor(pool, technical_analysis, df)
+            return {"ticker": ticker, **result}
+        except HTTPException as e:
+            return {"ticker": ticker, "error": str(e.detail)}
+        except Exception as e:
+            logger.error(f"Batch analysis failed for {ticker}: {e}")
+            return {"ticker": ticker, "error": f"error during analysis: {str(e)}"}
+
+    unique = list(dict.fromkeys(tickers))
+    # upstream calls yield rate-limit tokens to interactive /analyze requests
+    with priority(BATCH):
+        return await asyncio.gather(*(analyze_one(t) for t in unique))
@@ -1,80 +1,25 @@
 """
 data loader module
 """
+import numpy as np
 import pandas as pd
-import yfinance as yf
-from functools import lru_cache
-import time
+from typing import NamedTuple
+import asyncio
 import random
-from ..utils.formatters import safe_float
+import time
+from ..core.http_client import get_session
+from ..core.cache import SWRCache
+from ..core.rate_limit import is_rate_limit_error
+from . import price_store
+from .providers import scheduler
+from .price_series import PriceSeries, day_ordinal
+from .market_calendar import last_bar_change, last_session_day, next_bar_change, settle_end
 from fastapi import HTTPException
 from loguru import logger
 import os
-import requests
 import io
 
 
-def get_stock_metrics(ticker, start: str):
-    #this function is used to get the fundamental data for a company from FMP API a helper function for get_stock_data_from_fmp
-
-    # FMP provides 'quote' API for price, market cap, PE
-    # 'key-metrics-ttm' API provides PS, PB, FCF, etc. TTM data
-
-    #URL for FMP API
-    base_url = "https://financialmodelingprep.com/stable/"
-    api_key = os.getenv("FMP_API_KEY")
-    try:
-        # 1. get real-time price, market cap, PE
-        quote_url = f"{base_url}/quote?symbol={ticker}&apikey={api_key}&startDate={start}"
-        q_res = requests.get(quote_url).json()
-
-        # 2. get key financial metrics (TTM version)
-        metrics_url = f"{base_url}/key-metrics-ttm?symbol={ticker}&apikey={api_key}&startDate={start}"
-        m_res = requests.get(metrics_url).json()
-
-        if not q_res or not m_res:
-            logger.warning(f"failed to get complete data for {ticker}", detail=f"q_res: {q_res}, m_res: {m_res}")
-            return None
-
-        # Handle both list and dict responses
-        if isinstance(q_res, list) and len(q_res) > 0:
-            q = q_res[0]
-        elif isinstance(q_res, dict):
-            q = q_res
-        else:
-            return None
-
-        if isinstance(m_res, list) and len(m_res) > 0:
-            m = m_res[0]
-        elif isinstance(m_res, dict):
-            m = m_res
-        else:
-            return None
-
-        # Ensure q and m are dicts before accessing
-        if not isinstance(q, dict) or not isinstance(m, dict):
-            logger.warning(
-                f"Invalid response format for {ticker}: q is {type(q).__name__}, m is {type(m).__name__}")
-            return None
-
-        # map to your data structure
-        return pd.DataFrame(data={
-            "Price": [q.get("price")],
-            "Shares": [q.get("sharesOutstanding")],
-            "MarketCap": [q.get("marketCap")],
-            # estimate revenue
-            "RevenueTTM": [m.get("revenuePerShareTTM") * q.get("sharesOutstanding") if m.get("revenuePerShareTTM") and q.get("sharesOutstanding") else None],
-            "FCF": [m.get("freeCashFlowTTM")],
-            "PE": [q.get("pe")],
-            "PS": [m.get("priceToSalesRatioTTM")],
-            "PB": [m.get("priceToBookRatioTTM")],
-        })
-
-    except Exception as e:
-        logger.error(f"failed to get metrics for {ticker}: {e}")
-        return None
-
-
 def get_stock_data_from_fmp(ticker: str, start: str) -> pd.DataFrame:
     """
     get historical price data from FMP
@@ -89,8 +34,10 @@ def get_stock_data_from_fmp(ticker: str, start: str) -> pd.DataFrame:
     end = pd.Timestamp.today(tz="UTC").date().isoformat()
     url = f"{base_url}/historical-price-full/{ticker}?from={start}&to={end}&apikey={api_key}"
 
+    session = get_session()
+    import requests  # already loaded by get_session
     try:
-        res = requests.get(url, timeout=10)
+        res = session.get(url, timeout=10)
 
         if res.status_code in (401, 402, 403):
             payload = {}
@@ -101,7 +48,7 @@ def get_stock_data_from_fmp(ticker: str, start: str) -> pd.DataFrame:
         historical = payload.get("historical")
         if not historical:
             chart_url = f"{base_url}/historical-chart/1day/{ticker}?from={start}&to={end}&apikey={api_key}"
-            chart_res = requests.get(chart_url, timeout=10)
+            chart_res = session.get(chart_url, timeout=10)
             if chart_res.status_code in (401, 402, 403):
                 if chart_res.status_code != 403:
                     chart_res.raise_for_status()
@@ -112,7 +59,7 @@ def get_stock_data_from_fmp(ticker: str, start: str) -> pd.DataFrame:
                 f"{stable_base_url}/historical-price-eod/full"
                 f"?symbol={ticker}&from={start}&to={end}&apikey={api_key}"
             )
-            stable_res = requests.get(stable_url, timeout=10)
+            stable_res = session.get(stable_url, timeout=10)
             if stable_res.status_code in (401, 402, 403):
                 if stable_res.status_code != 403:
                     stable_res.raise_for_status()
@@ -176,29 +123,15 @@ def get_stock_data_from_fmp(ticker: str, start: str) -> pd.DataFrame:
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors="coerce")
 
-        try:
-            #Get the fundamental data for the company with helper function get_stock_metrics
-            metrics_df = get_stock_metrics(ticker, start)
-        except (NameError, AttributeError):
-            metrics_df = None
-        #if the fundamental data is not None and not empty, add the fundamental data to the dataframe
-        #Time complexity is high because of the loop and the dictionary operation
-        #TODO: optimize the time complexity
-        
-        if metrics_df is not None and not metrics_df.empty:
-            metrics_row = metrics_df.iloc[0].to_dict()
-            for key, value in metrics_row.items():
-                df[key] = value
-
         optional_cols = ["Open", "Volume"]
         cols_to_return = required_cols + \
             [col for col in optional_cols if col in df.columns]
-        if metrics_df is not None and not metrics_df.empty:
-            cols_to_return += [col for col in metrics_df.columns if col not in cols_to_return]
         return df[cols_to_return]
     except requests.RequestException as e:
         status_code = getattr(
             getattr(e, "response", None), "status_code", None)
+        if status_code == 429:
+            raise Exception(f"Rate limit: FMP returned 429 for {ticker}")
         logger.error(
             f"Failed to get historical data from FMP for {ticker}: {type(e).__name__} status={status_code}")
         return None
@@ -208,12 +141,14 @@ def get_stock_data_from_fmp(ticker: str, start: str) -> pd.DataFrame:
         return None
 
 
-def get_stock_data_from_yfinance(ticker: str, start: str) -> pd.DataFrame:
+def get_stock_data_from_yfinance(ticker: str, start: str, min_rows: int = 260) -> pd.DataFrame:
     """
     get historical price data from yfinance
     return historical price data with columns: Close, High, Low, Open, Volume
     """
-    tk = yf.Ticker(ticker)
+    # yfinance takes a few hundred ms to import: load it on first use, not at boot
+    import yfinance as yf
+    tk = yf.Ticker(ticker, session=get_session())
 
     try:
         # get historical price data (this is the main data for technical analysis)
@@ -229,6 +164,7 @@ def get_stock_data_from_yfinance(ticker: str, start: str) -> pd.DataFrame:
                 progress=False,
                 auto_adjust=False,
                 threads=False,
+                session=get_session(),
             )
 
         if hist is None or hist.empty:
@@ -236,7 +172,7 @@ def get_stock_data_from_yfinance(ticker: str, start: str) -> pd.DataFrame:
             return None
 
         # ensure there are enough trading days (at least 260 days, about 1 year)
-        if len(hist) < 260:
+        if len(hist) < min_rows:
             logger.warning(
                 f"Insufficient historical data for {ticker}: {len(hist)} days")
             return None
@@ -299,8 +235,11 @@ def get_stock_data_from_stooq(ticker: str, start: str) -> pd.DataFrame:
         symbol = f"{symbol}.us"
 
     url = f"https://stooq.com/q/d/l/?s={symbol}&i=d"
+    if start:
+        # only download bars from start onwards instead of the full history
+        url += f"&d1={pd.Timestamp(start).strftime('%Y%m%d')}"
     try:
-        res = requests.get(url, timeout=10)
+        res = get_session().get(url, timeout=10)
         res.raise_for_status()
 
         df = pd.read_csv(io.StringIO(res.text))
@@ -342,10 +281,114 @@ def get_stock_data_from_stooq(ticker: str, start: str) -> pd.DataFrame:
         return None
 
 
-@lru_cache(maxsize=50)
-def load_price_cached(ticker: str, start: str, cache_buster: int = None, max_retries: int = 3) -> pd.DataFrame:
+# providers in priority order: (name, function, extra kwargs)
+PRICE_PROVIDERS = (
+    ("FMP", get_stock_data_from_fmp, {}),
+    ("yfinance", get_stock_data_from_yfinance, {}),
+    ("stooq", get_stock_data_from_stooq, {}),
+)
+# delta fetches may legitimately return a handful of bars
+PRICE_DELTA_PROVIDERS = (
+    ("FMP", get_stock_data_from_fmp, {}),
+    ("yfinance", get_stock_data_from_yfinance, {"min_rows": 1}),
+    ("stooq", get_stock_data_from_stooq, {}),
+)
+
+
+class _PriceEntry(NamedTuple):
+    ticker: str
+    start: str             # earliest start the cached history was fetched for
+    series: PriceSeries
+
+
+# float64 serves the store's shared mapping as-is (bit-identical indicator results);
+# float32 halves the size of each cached history but is a private per-worker copy
+PRICE_CACHE_DTYPE = np.dtype(os.getenv("PRICE_CACHE_DTYPE", "float64"))
+# refresh interval while a market session (or its settle window) is running, and for
+# tickers on a market without a known calendar
+DATA_CACHE_TTL = float(os.getenv("DATA_CACHE_TTL", 900))
+# a stored history synced this recently (by any worker) is not re-synced with upstream
+STORE_SYNC_TTL = DATA_CACHE_TTL
+# a delta must reproduce the stored close of the bar it overlaps within this relative
+# tolerance; a larger gap means upstream re-adjusted the history (split, dividend)
+PRICE_DELTA_TOLERANCE = float(os.getenv("PRICE_DELTA_TOLERANCE", 0.001))
+# refetch the whole stored history at least this often (seconds, 0 disables), catching
+# adjustments the overlap check cannot see
+PRICE_FULL_RESYNC = float(os.getenv("PRICE_FULL_RESYNC", 7 * 86400))
+
+
+def _missing_bar(ticker: str, series: PriceSeries, now: float) -> bool:
+    """whether the newest session whose bar must be published by now is not in series"""
+    expected = last_session_day(ticker, now)
+    return expected is not None and len(series) > 0 and series.days[-1] < day_ordinal(expected)
+
+
+def price_fresh_for(ticker: str, series: PriceSeries, now: float = None) -> float:
+    """
+    seconds the history stays current: until the market's next open when no bar can
+    change before it, else DATA_CACHE_TTL (during a session, while a bar that should
+    exist is still missing, or when the market has no known calendar)
+    """
+    now = time.time() if now is None else now
+    change = next_bar_change(ticker, now)
+    if change is None or _missing_bar(ticker, series, now):
+        return DATA_CACHE_TTL
+    if change <= now:
+        # expire no later than the end of the settle window, so the final bar is
+        # picked up right after it instead of up to DATA_CACHE_TTL later
+        return max(min(DATA_CACHE_TTL, settle_end(ticker, now) - now), 1.0)
+    return change - now
+
+
+def needs_sync(ticker: str, stored: PriceSeries, synced: float) -> bool:
+    """whether bars may have changed upstream since the history was synced at `synced`"""
+    now = time.time()
+    if now - synced < STORE_SYNC_TTL:
+        return False
+    changed = last_bar_change(ticker, now)
+    return changed is None or synced < changed or _missing_bar(ticker, stored, now)
+
+
+# in-process price cache: ticker -> longest history fetched so far, bounded by the
+# resident size of the frames rather than an entry count; entries stay fresh until
+# the ticker's market can produce a new bar, so nights, weekends and holidays cost
+# no upstream calls
+price_cache = SWRCache(
+    "price",
+    soft_ttl=DATA_CACHE_TTL,
+    hard_ttl=float(os.getenv("DATA_CACHE_HARD_TTL", 86400)),
+    max_bytes=int(os.getenv("PRICE_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+    ttl_for=lambda entry: price_fresh_for(entry.ticker, entry.series),
+)
+
+
+# the last bar can trail today by a weekend plus a run of holidays; loading this many
+# more days lets a window be cut back from the last bar instead of from today
+WINDOW_MARGIN_DAYS = 14
+
+
+def history_start(years: int, margin_days: int = 0) -> str:
+    """start date (UTC, ISO) for a look-back of `years` years, plus `margin_days` days"""
+    days = 365 * years + margin_days
+    return (pd.Timestamp.today(tz="UTC") - pd.Timedelta(days=days)).date().isoformat()
+
+
+def window_start(series: PriceSeries, years: int) -> str:
+    """
+    start date for a look-back of `years` years ending at the series' last bar
+    unlike history_start it only moves when a new bar arrives, so a window (and
+    everything computed from it) stays the same over nights and weekends; load
+    from history_start(years, WINDOW_MARGIN_DAYS) so the series reaches back to it
+    """
+    last = pd.Timestamp(series.days[-1].astype("datetime64[D]"))
+    return (last - pd.Timedelta(days=365 * years)).date().isoformat()
+
+
+async def fetch_price(ticker: str, start: str, max_retries: int = 3) -> pd.DataFrame:
     """
-    load historical price data (with cache, 15 minutes expiration)
+    fetch historical price data without blocking the event loop
+    each blocking provider call runs in a worker thread and every backoff is an
+    asyncio sleep, so one slow ticker does not stall other requests
     return historical price data with columns: Close, High, Low
     """
     # read configuration from environment variables
@@ -358,22 +401,13 @@ def load_price_cached(ticker: str, start: str, cache_buster: int = None, max_ret
                 delay = 1.5 ** attempt
                 logger.info(
                     f"Retrying {ticker} after {delay:.1f}s delay (attempt {attempt + 1}/{max_retries})")
-                time.sleep(delay)
-
-            # prioritize getting historical price data from FMP, if failed fallback to yfinance
-            df = get_stock_data_from_fmp(ticker, start)
-            if df is None or df.empty:
-                logger.warning(
-                    f"Failed to get historical price data from FMP for {ticker}, trying yinance")
-                df = get_stock_data_from_yfinance(ticker, start)
+                await asyncio.sleep(delay)
 
-            if df is None or df.empty:
-                logger.warning(
-                    f"Failed to get historical price data from yfinance for {ticker}, trying stooq")
-                df = get_stock_data_from_stooq(ticker, start)
+            # race FMP -> yfinance -> stooq, skipping open circuits and hedging slow providers
+            result = await scheduler.race(ticker, start, PRICE_PROVIDERS, min_rows=260)
 
-            # verify data completeness
-            if df is None or df.empty:
+            # verify data completeness (at least 260 trading days, about 1 year)
+            if result is None:
                 logger.warning(
                     f"No data returned for {ticker} on attempt {attempt + 1}")
                 if attempt < max_retries - 1:
@@ -383,33 +417,10 @@ def load_price_cached(ticker: str, start: str, cache_buster: int = None, max_ret
                         status_code=503,
                         detail=f"No data available for {ticker}. Please try again later."
                     )
-
-            # check required columns
-            if "Close" not in df.columns:
-                logger.error(
-                    f"Missing 'Close' column for {ticker}. Columns: {df.columns.tolist()}")
-                if attempt < max_retries - 1:
-                    continue
-                else:
-                    raise HTTPException(
-                        status_code=503,
-                        detail=f"Invalid data format for {ticker}. Missing required columns."
-                    )
-
-            # check data volume (at least 260 trading days, about 1 year)
-            if len(df) < 260:
-                logger.warning(
-                    f"Insufficient data for {ticker}: {len(df)} rows (need at least 260)")
-                if attempt < max_retries - 1:
-                    continue
-                else:
-                    raise HTTPException(
-                        status_code=503,
-                        detail=f"Insufficient historical data for {ticker}. Need at least 260 trading days."
-                    )
+            provider, df = result
 
             logger.info(
-                f"Loaded price data for {ticker} from {start} to {pd.Timestamp.today(tz='UTC').date().isoformat()} after {attempt + 1} attempts ({len(df)} rows)")
+                f"Loaded price data for {ticker} from {provider} ({start} to {pd.Timestamp.today(tz='UTC').date().isoformat()}) after {attempt + 1} attempts ({len(df)} rows)")
             return df
 
         except HTTPException:
@@ -429,18 +440,168 @@ def load_price_cached(ticker: str, start: str, cache_buster: int = None, max_ret
                     detail=f"Yahoo Finance API rate limit or temporarily unavailable. Please try again later. Error: {error_msg}"
                 )
 
-            # if it is a rate limit error, increase delay time
-            if "429" in error_msg or "Too Many Requests" in error_msg or "Rate limit" in error_msg:
-                delay = random.uniform(10, 20)  # wait longer for 429 error
-                logger.warning(
-                    f"Rate limit detected for {ticker}, waiting {delay:.1f}s before retry")
-                time.sleep(delay)
-            else:
+            # a 429 has already drained that provider's shared token bucket, so retry at once:
+            # the next race skips it, and if nothing else can serve the request is shed
+            # with Retry-After instead of sleeping here
+            if not is_rate_limit_error(error_msg):
                 # other errors, use exponential backoff
-                time.sleep(random.uniform(2, 5))
+                await asyncio.sleep(random.uniform(2, 5))
+
+
+async def fetch_price_delta(ticker: str, since: str) -> pd.DataFrame:
+    """
+    fetch only the bars from `since` onwards (inclusive, so a revised last bar is picked up)
+    return None if every provider failed
+    """
+    try:
+        result = await scheduler.race(ticker, since, PRICE_DELTA_PROVIDERS, min_rows=1)
+    except Exception as e:
+        logger.warning(f"Delta fetch failed for {ticker}: {e}")
+        return None
+    return result[1] if result is not None else None
+
+
+def _overlap_matches(stored: PriceSeries, delta: pd.DataFrame) -> bool:
+    """whether the delta's first bar agrees with the stored bar of the same day"""
+    new = PriceSeries.from_frame(delta)
+    pos = int(np.searchsorted(stored.days, new.days[0]))
+    if pos == len(stored) or stored.days[pos] != new.days[0]:
+        return False
+    old = float(stored["Close"][pos])
+    return abs(float(new["Close"][0]) - old) <= PRICE_DELTA_TOLERANCE * abs(old)
+
+
+async def _refetch_stored(ticker: str, start: str, max_retries: int) -> PriceSeries:
+    df = await fetch_price(ticker, start, max_retries)
+    return await asyncio.to_thread(price_store.write, ticker, df, start)
+
+
+async def _sync_stored(ticker: str, stored: PriceSeries, covered: str, max_retries: int) -> PriceSeries:
+    """
+    bring a stored history up to date: normally only the bars after its last settled
+    one, the whole range when upstream re-adjusted it or PRICE_FULL_RESYNC has passed
+    if upstream cannot be reached the stored history is served as it is
+    """
+    if PRICE_FULL_RESYNC > 0 and time.time() - price_store.full_synced_at(ticker) >= PRICE_FULL_RESYNC:
+        try:
+            return await _refetch_stored(ticker, covered, max_retries)
+        except HTTPException as e:
+            logger.warning(f"Full resync failed for {ticker}, syncing new bars only: {e.detail}")
+
+    # start at the bar before the last stored one: that bar is settled, so any
+    # difference to what is stored comes from a re-adjusted history
+    since = stored.index[-min(len(stored), 2)].date().isoformat()
+    delta = await fetch_price_delta(ticker, since)
+    if delta is None:
+        logger.warning(f"Delta fetch failed for {ticker}, serving stored prices up to {stored.index[-1].date()}")
+        return stored
+    if not _overlap_matches(stored, delta):
+        logger.warning(f"New bars for {ticker} do not match the stored close on {since} "
+                       f"(split or dividend adjustment?), refetching the full history")
+        try:
+            return await _refetch_stored(ticker, covered, max_retries)
+        except HTTPException as e:
+            logger.warning(f"Full refetch failed for {ticker}, serving stored prices: {e.detail}")
+            return stored
+    stored = await asyncio.to_thread(price_store.append, ticker, stored, delta)
+    logger.info(f"Appended {len(delta)} bars since {since} to stored prices for {ticker}")
+    return stored
+
+
+async def load_price_stored(ticker: str, start: str, max_retries: int = 3) -> PriceSeries:
+    """
+    load historical price data through the on-disk store shared by all workers
+    one worker at a time fills a ticker: a cold one (or one whose stored history
+    starts too late) fetches the full range, a warm one only the bars since its last
+    settled one (see _sync_stored); a history synced (by any worker) within DATA_CACHE_TTL, or after
+    the last time its market could change a bar, is used as-is
+    """
+    async with price_store.locked(ticker):
+        stored = await asyncio.to_thread(price_store.read, ticker)
+        covered = price_store.coverage_start(ticker)
+        if stored is None or covered is None or covered > start:
+            stored = await _refetch_stored(ticker, start, max_retries)
+        elif needs_sync(ticker, stored, price_store.synced_at(ticker)):
+            stored = await _sync_stored(ticker, stored, covered, max_retries)
+
+    series = stored.slice_from(start)
+    if len(series) < 260:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Insufficient historical data for {ticker}. Need at least 260 trading days."
+        )
+    return series
+
+
+async def load_price_cached(ticker: str, start: str, max_retries: int = 3, fresh: bool = False) -> PriceSeries:
+    """
+    load historical price data (stale-while-revalidate cache)
+    the cache holds one superset history per ticker as a compact PriceSeries: any
+    shorter horizon is served as a view of it, and a longer history is fetched only
+    when a request needs more
+    fresh=True waits for a stale entry to be brought up to date instead of serving it
+    """
+    def accept(entry: _PriceEntry) -> bool:
+        return entry.start <= start and (not fresh or price_cache.is_fresh(ticker))
+
+    entry = await price_cache.get(ticker, _price_loader(ticker, start, max_retries), accept=accept)
+    return entry.series.slice_from(start)
+
+
+def _price_loader(ticker: str, start: str, max_retries: int = 3):
+    async def load():
+        # keep the superset: never fetch less than what is already cached
+        cached = price_cache.peek(ticker)
+        fetch_start = min(start, cached.start) if cached is not None else start
+        series = await load_price_stored(ticker, fetch_start, max_retries)
+        return _PriceEntry(ticker, fetch_start, series.astype(PRICE_CACHE_DTYPE))
+    return load
+
+
+def cached_histories() -> list:
+    """(ticker, start, PriceSeries) of every history in the price cache"""
+    return [(e.ticker, e.start, e.series) for _, e, _ in price_cache.items()]
+
+
+def seed_price_cache(ticker: str, start: str, series: PriceSeries, synced: float):
+    """
+    put a history restored from disk into the price cache, aged from `synced`; one
+    that may have missed bars since is stored stale, so it is served at once and
+    refreshed in the background on first use, unless it is past the hard TTL too
+    """
+    now = time.time()
+    age = max(now - synced, 0.0)
+    ttl = 0.0 if needs_sync(ticker, series, synced) else age + price_fresh_for(ticker, series, now)
+    price_cache.put(ticker, _PriceEntry(ticker, start, series.astype(PRICE_CACHE_DTYPE)),
+                    _price_loader(ticker, start), ttl=ttl, age=age)
+
+
+async def load_price_async(ticker: str, start: str, fresh: bool = False) -> PriceSeries:
+    """load price data (with cache control), for use inside the event loop"""
+    return await load_price_cached(ticker, start, fresh=fresh)
+
+
+async def load_prices(tickers: list, start: str, concurrency: int = 8) -> tuple:
+    """
+    load many tickers with bounded concurrency
+    return ({ticker: PriceSeries}, {ticker: error message})
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    frames, errors = {}, {}
+
+    async def load_one(ticker: str):
+        try:
+            async with semaphore:
+                frames[ticker] = await load_price_async(ticker, start)
+        except HTTPException as e:
+            errors[ticker] = str(e.detail)
+        except Exception as e:
+            errors[ticker] = str(e)
+
+    await asyncio.gather(*(load_one(t) for t in dict.fromkeys(tickers)))
+    return frames, errors
 
 
-def load_price(ticker: str, start: str) -> pd.DataFrame:
-    """load price data (with cache control)"""
-    cache_buster = int(time.time() / 900)  # 15 minutes
-    return load_price_cached(ticker, start, cache_buster)
+def load_price(ticker: str, start: str) -> PriceSeries:
+    """load price data (with cache control), blocking wrapper for scripts"""
+    return asyncio.run(load_price_async(ticker, start))
@@ -1,62 +1,308 @@
 """
 基本面分析模块
 """
-import yfinance as yf
+import asyncio
+import os
+import time
 import pandas as pd
+from loguru import logger
 from ..utils.formatters import safe_float
-from functools import lru_cache
-import time
+from ..core.cache import SWRCache
+from ..core.http_client import get_session, run_io
+from ..core.rate_limit import RateLimited, limiter
 
+FMP_STABLE_URL = "https://financialmodelingprep.com/stable"
+# batch-quote 单次请求的 symbol 数上限
+FMP_BATCH_SIZE = int(os.getenv("FMP_BATCH_SIZE", 100))
 
-@lru_cache(maxsize=100)
-def get_fundamentals_cached(ticker: str, cache_buster: int) -> dict:
-    """
-    获取基本面数据（带缓存，15分钟过期）
-    """
-    tk = yf.Ticker(ticker)
+FUNDAMENTAL_FIELDS = ("Price", "Shares", "MarketCap", "RevenueTTM", "FCF", "PE", "PS", "PB")
+
+# 收入、FCF、股本只在公司发布财报时变化：快照在下次财报日 + 宽限期后才过期，
+# 财报日未知或已过时按 FUNDAMENTALS_TTL 重新拉取
+FUNDAMENTALS_TTL = float(os.getenv("FUNDAMENTALS_TTL", 86400))
+FUNDAMENTALS_MAX_TTL = float(os.getenv("FUNDAMENTALS_MAX_TTL", 30 * 86400))
+FUNDAMENTALS_REPORT_GRACE = float(os.getenv("FUNDAMENTALS_REPORT_GRACE", 2 * 86400))
+# 所有来源都失败（字段全为空）的快照很快重试，而不是一整天都显示 N/A
+FUNDAMENTALS_EMPTY_TTL = float(os.getenv("FUNDAMENTALS_EMPTY_TTL", 300))
+
+
+def fundamentals_ttl(f: dict, now: float = None) -> float:
+    """快照自 now（默认当前时间，恢复的快照传拉取时间）起的有效期（秒）：到下次财报日之后的宽限期结束为止"""
+    if all(f.get(k) is None for k in FUNDAMENTAL_FIELDS):
+        return min(FUNDAMENTALS_EMPTY_TTL, FUNDAMENTALS_TTL)
+    next_report = f.get("NextReport")
+    now = time.time() if now is None else now
+    if next_report is None or next_report + FUNDAMENTALS_REPORT_GRACE <= now:
+        return FUNDAMENTALS_TTL
+    return min(next_report + FUNDAMENTALS_REPORT_GRACE - now, FUNDAMENTALS_MAX_TTL)
+
+
+# 基本面缓存：过期后先返回旧快照并在后台刷新，再过 DATA_CACHE_HARD_TTL 仍未刷新成功才丢弃
+fundamentals_cache = SWRCache(
+    "fundamentals",
+    soft_ttl=FUNDAMENTALS_TTL,
+    hard_ttl=FUNDAMENTALS_TTL + float(os.getenv("DATA_CACHE_HARD_TTL", 86400)),
+    # 快照只是几个数字，按占用字节计，容量够放下整个 watchlist
+    max_bytes=int(os.getenv("FUNDAMENTALS_CACHE_MAX_BYTES", 8 * 1024 * 1024)),
+    ttl_for=fundamentals_ttl,
+)
+
+
+def _timestamp(value):
+    """财报时间（epoch 秒或日期字符串）转 epoch 秒，无法解析返回 None"""
+    if value is None or value == "":
+        return None
     try:
-        info = tk.info or {}
-    except Exception:
-        info = {}
+        if isinstance(value, (int, float)):
+            return float(value)
+        ts = pd.Timestamp(value)
+        return (ts.tz_localize("UTC") if ts.tzinfo is None else ts).timestamp()
+    except (ValueError, TypeError):
+        return None
 
-    price = info.get("currentPrice") or info.get("regularMarketPrice")
-    shares = info.get("sharesOutstanding")
-    mktcap = info.get("marketCap")
-    pe = info.get("trailingPE")
-    ps = info.get("priceToSalesTrailing12Months")
-    pb = info.get("priceToBook")
 
-    revenue_ttm = info.get("totalRevenue")
-    fcf = None
+def fetch_info(ticker: str) -> dict:
+    """报价 / 概要信息（阻塞）"""
+    import yfinance as yf  # 首次使用时才导入，不拖慢冷启动
+    try:
+        return yf.Ticker(ticker).info or {}
+    except Exception:
+        return {}
+
 
-    # 尽力从 cashflow 拿 OCF 和 CapEx（可能缺失）
+def fetch_fcf(ticker: str):
+    """
+    从 cashflow 拿 OCF 和 CapEx 算 FCF（阻塞，尽力而为，可能缺失）
+    """
+    import yfinance as yf
     try:
-        cf = tk.cashflow
+        cf = yf.Ticker(ticker).cashflow
         if cf is not None and not cf.empty:
             col = cf.columns[0]
             ocf = cf.loc["Total Cash From Operating Activities", col] if "Total Cash From Operating Activities" in cf.index else None
             capex = cf.loc["Capital Expenditures", col] if "Capital Expenditures" in cf.index else None
             if ocf is not None and capex is not None and pd.notna(ocf) and pd.notna(capex):
-                fcf = float(ocf) - float(capex)
+                return float(ocf) - float(capex)
     except Exception:
         pass
+    return None
 
+
+def build_fundamentals(info: dict, fcf) -> dict:
+    """由 info 和 FCF 组装基本面字段"""
+    price = info.get("currentPrice") or info.get("regularMarketPrice")
     return {
         "Price": safe_float(price),
-        "Shares": safe_float(shares),
-        "MarketCap": safe_float(mktcap),
-        "RevenueTTM": safe_float(revenue_ttm),
+        "Shares": safe_float(info.get("sharesOutstanding")),
+        "MarketCap": safe_float(info.get("marketCap")),
+        "RevenueTTM": safe_float(info.get("totalRevenue")),
         "FCF": safe_float(fcf),
-        "PE": safe_float(pe),
-        "PS": safe_float(ps),
-        "PB": safe_float(pb),
+        "PE": safe_float(info.get("trailingPE")),
+        "PS": safe_float(info.get("priceToSalesTrailing12Months")),
+        "PB": safe_float(info.get("priceToBook")),
+        "NextReport": _timestamp(info.get("earningsTimestampStart") or info.get("earningsTimestamp")),
     }
 
 
+async def _limited(provider: str, fn, *args):
+    """取得 provider 的限流令牌后在上游 I/O 线程池中执行阻塞请求"""
+    await limiter.acquire(provider)
+    return await run_io(fn, *args)
+
+
+def _first_record(res):
+    """FMP 返回 list 或 dict，取第一条记录"""
+    if isinstance(res, list):
+        res = res[0] if res else None
+    return res if isinstance(res, dict) and res else None
+
+
+def fetch_fmp_json(endpoint: str, ticker: str):
+    """FMP stable 接口的一次请求（阻塞），失败返回 None"""
+    url = f"{FMP_STABLE_URL}/{endpoint}?symbol={ticker}&apikey={os.getenv('FMP_API_KEY')}"
+    try:
+        res = get_session().get(url, timeout=10)
+        res.raise_for_status()
+        return _first_record(res.json())
+    except Exception as e:
+        logger.warning(f"FMP {endpoint} failed for {ticker}: {type(e).__name__}")
+        return None
+
+
+def fetch_fmp_quotes(tickers: list) -> dict:
+    """FMP batch-quote：一次请求多个 symbol（阻塞），返回 {symbol: quote}，失败返回空 dict"""
+    url = f"{FMP_STABLE_URL}/batch-quote?symbols={','.join(tickers)}&apikey={os.getenv('FMP_API_KEY')}"
+    try:
+        res = get_session().get(url, timeout=20)
+        res.raise_for_status()
+        payload = res.json()
+    except Exception as e:
+        logger.warning(f"FMP batch-quote failed for {len(tickers)} symbols: {type(e).__name__}")
+        return {}
+    if not isinstance(payload, list):
+        return {}
+    return {q["symbol"]: q for q in payload if isinstance(q, dict) and q.get("symbol")}
+
+
+def build_fmp_fundamentals(q: dict, m: dict) -> dict:
+    """由 FMP quote 和 key-metrics-ttm 组装基本面字段"""
+    shares = q.get("sharesOutstanding")
+    revenue_per_share = m.get("revenuePerShareTTM")
+    return {
+        "Price": safe_float(q.get("price")),
+        "Shares": safe_float(shares),
+        "MarketCap": safe_float(q.get("marketCap")),
+        # 用每股收入估算总收入
+        "RevenueTTM": safe_float(revenue_per_share * shares if revenue_per_share and shares else None),
+        "FCF": safe_float(m.get("freeCashFlowTTM")),
+        "PE": safe_float(q.get("pe")),
+        "PS": safe_float(m.get("priceToSalesRatioTTM")),
+        "PB": safe_float(m.get("priceToBookRatioTTM")),
+        "NextReport": _timestamp(q.get("earningsAnnouncement")),
+    }
+
+
+async def fetch_fmp_fundamentals(ticker: str):
+    """
+    从 FMP 获取基本面快照：quote（价格、市值、PE）和 key-metrics-ttm（PS、PB、FCF）并发请求
+    未配置 FMP_API_KEY 或任一接口不可用时返回 None
+    """
+    if not os.getenv("FMP_API_KEY"):
+        return None
+    q, m = await asyncio.gather(
+        _limited("FMP", fetch_fmp_json, "quote", ticker),
+        _limited("FMP", fetch_fmp_json, "key-metrics-ttm", ticker),
+    )
+    if q is None or m is None:
+        return None
+    return build_fmp_fundamentals(q, m)
+
+
+async def fetch_yfinance_fundamentals(ticker: str) -> dict:
+    """
+    从 yfinance 获取基本面数据
+    info 和 cashflow 是两次独立的上游请求，并发执行；只有一个拿到限流令牌时用拿到的部分，
+    两个都拿不到时抛出 RateLimited
+    """
+    info, fcf = await asyncio.gather(
+        _limited("yfinance", fetch_info, ticker),
+        _limited("yfinance", fetch_fcf, ticker),
+        return_exceptions=True,
+    )
+    for res in (info, fcf):
+        if isinstance(res, BaseException) and not isinstance(res, RateLimited):
+            raise res
+    if isinstance(info, RateLimited) and isinstance(fcf, RateLimited):
+        raise info
+    return build_fundamentals({} if isinstance(info, RateLimited) else info,
+                              None if isinstance(fcf, RateLimited) else fcf)
+
+
+async def fetch_fundamentals(ticker: str) -> dict:
+    """
+    获取基本面快照（不带缓存）：优先 FMP，不可用或被限流时回退到 yfinance，
+    所有来源都拿不到数据时返回全为空（N/A）的快照
+    价格数据只保留 OHLCV，基本面只从这里取，不再随价格数据重复请求
+    """
+    try:
+        f = await fetch_fmp_fundamentals(ticker)
+        if f is not None:
+            return f
+    except RateLimited:
+        logger.info(f"FMP fundamentals skipped for {ticker}: no rate-limit token, falling back to yfinance")
+    try:
+        return await fetch_yfinance_fundamentals(ticker)
+    except RateLimited:
+        logger.warning(f"No rate-limit token for {ticker} fundamentals from any source, serving N/A")
+        return build_fundamentals({}, None)
+
+
+async def get_fundamentals_async(ticker: str) -> dict:
+    """获取基本面数据（事件循环内使用，带缓存，同一时刻相同 ticker 只请求一次上游）"""
+    return await fundamentals_cache.get(ticker, lambda: fetch_fundamentals(ticker))
+
+
+def seed_fundamentals(ticker: str, f: dict, age: float):
+    """
+    把磁盘上恢复的快照放进缓存：有效期和过期后的兜底期都从 age 秒前的拉取时间算起，
+    已超过兜底期的快照不放入
+    """
+    fetched = time.time() - age
+    fundamentals_cache.put(ticker, f, lambda: fetch_fundamentals(ticker),
+                           ttl=fundamentals_ttl(f, fetched), age=age)
+
+
+async def load_fundamentals_bulk(tickers: list, concurrency: int = 8) -> dict:
+    """
+    批量刷新基本面缓存，返回 {ticker: 快照}（拿不到的 ticker 不在结果中）
+    缓存中未过期的快照直接复用；其余的 quote 按 FMP_BATCH_SIZE 分块批量请求，
+    key-metrics-ttm 没有多 symbol 接口，按 ticker 并发请求；
+    FMP 不可用的 ticker 回退到逐个 get_fundamentals_async
+    """
+    tickers = list(dict.fromkeys(tickers))
+    result = {t: fundamentals_cache.peek(t) for t in tickers if fundamentals_cache.is_fresh(t)}
+    need = [t for t in tickers if t not in result]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    if need and os.getenv("FMP_API_KEY"):
+        chunks = [need[i:i + FMP_BATCH_SIZE] for i in range(0, len(need), FMP_BATCH_SIZE)]
+        quotes = {}
+        for part in await asyncio.gather(*(_limited("FMP", fetch_fmp_quotes, c) for c in chunks),
+                                         return_exceptions=True):
+            if isinstance(part, dict):
+                quotes.update(part)
+
+        async def metrics(ticker: str):
+            async with semaphore:
+                try:
+                    return await _limited("FMP", fetch_fmp_json, "key-metrics-ttm", ticker)
+                except RateLimited:
+                    return None
+
+        quoted = [t for t in need if t in quotes]
+        for ticker, m in zip(quoted, await asyncio.gather(*(metrics(t) for t in quoted))):
+            if m is None:
+                continue
+            f = build_fmp_fundamentals(quotes[ticker], m)
+            fundamentals_cache.put(ticker, f, lambda t=ticker: fetch_fundamentals(t))
+            result[ticker] = f
+        need = [t for t in need if t not in result]
+
+    async def load_one(ticker: str):
+        async with semaphore:
+            try:
+                result[ticker] = await get_fundamentals_async(ticker)
+            except Exception as e:
+                logger.warning(f"Failed to load fundamentals for {ticker}: {e}")
+
+    await asyncio.gather(*(load_one(t) for t in need))
+    return result
+
+
 def get_fundamentals(ticker: str) -> dict:
-    """获取基本面数据（带缓存控制）"""
-    cache_buster = int(time.time() / 900)  # 15分钟
-    return get_fundamentals_cached(ticker, cache_buster)
+    """获取基本面数据（带缓存控制，脚本中使用的阻塞版本）"""
+    return asyncio.run(get_fundamentals_async(ticker))
+
+
+def reprice(f: dict, close) -> dict:
+    """
+    用最新收盘价重算价格相关字段（Price、MarketCap、PE/PS/PB），其余字段沿用快照
+    估值倍数按价格比例缩放，分母（盈利、收入、净资产）在两次财报之间不变
+    """
+    out = {k: f.get(k) for k in FUNDAMENTAL_FIELDS}
+    close = safe_float(close)
+    if close is None:
+        return out
+    ref = out["Price"]
+    out["Price"] = close
+    if ref:
+        scale = close / ref
+        for k in ("MarketCap", "PE", "PS", "PB"):
+            if out[k] is not None:
+                out[k] = out[k] * scale
+    elif out["Shares"]:
+        out["MarketCap"] = close * out["Shares"]
+    return out
 
 
 def rough_fair_value_range(f: dict) -> dict:
@@ -0,0 +1,353 @@
+"""
+增量指标状态：/analyze 的分析窗口每次刷新只处理新进入 / 离开窗口的 K 线
+
+窗口内的求和（MA、收益率一阶 / 二阶矩、Wilder RSI）按 2^128 定点整数累计，加减没有舍入误差，
+快照只取决于窗口内容、与更新路径无关：逐根推进与从头构建得到完全相同的结果，
+多个 worker 的响应体和 ETag 一致；快照与 compute_indicators 在最后一位舍入内相同
+"""
+import math
+import os
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+import numpy as np
+
+from .indicators import _RSI_TAIL, _atr_last, _pct_rank
+
+# 定点比例：绝对值 >= 2^-76 的价格及任意收益率（都是 2^-53 的整数倍）乘以 2^128 后是精确整数
+_SCALE = 128
+_ONE = 2.0 ** _SCALE
+# 回撤窗口与两个分位窗口（有序表）、两条均线窗口（精确和）
+_SORTED_WINDOWS = (252, 756, 1260)
+_MA_WINDOWS = (50, 200)
+
+# 每个 worker 保留的 (ticker, years) 状态数，LRU 淘汰
+INDICATOR_STATE_MAX = int(os.getenv("INDICATOR_STATE_MAX", "64"))
+
+
+def _fixed(x: float) -> int:
+    return int(x * _ONE)
+
+
+@lru_cache(maxsize=None)
+def _p13(k: int) -> int:
+    return 13 ** k
+
+
+@lru_cache(maxsize=None)
+def _p14(k: int) -> int:
+    return 14 ** k
+
+
+def _return(prev: float, cur: float) -> float:
+    """cur / prev - 1，前收盘为 0 时与 NumPy 一致得到 inf / NaN"""
+    if prev == 0:
+        return math.nan if cur == 0 else math.inf
+    return cur / prev - 1
+
+
+def _gain_loss(prev: float, cur: float) -> tuple[int, int]:
+    d = cur - prev
+    return _fixed(max(d, 0.0)), _fixed(max(-d, 0.0))
+
+
+class IndicatorState:
+    """
+    单个分析窗口的指标状态，update(window) 把状态推进到新窗口
+
+    - MA50 / MA200：窗口和，进出各一次加减
+    - Vol：收益率的 Σr、Σr²，新收益率加入、最旧的移出，O(1)
+    - RSI：最近 1000 个涨跌幅上的 Wilder 递推，以 13^k / 14^k 加权的精确和保存，两端进出均为 O(1) 次整数运算
+    - DD1Y / Pct3Y / Pct5Y：最近 252 / 756 / 1260 个收盘价的有序表，二分定位 + 最多 w 个指针的 memmove
+    - ATR14：直接取窗口最后 15 根
+    对象可直接 pickle
+    """
+
+    __slots__ = ("window", "closes", "sorted", "sums", "ret_n", "ret_inf", "ret_s1", "ret_s2",
+                 "rsi_m", "rsi_seed", "rsi_acc")
+
+    def __init__(self):
+        self.window = None               # 当前窗口（PriceSeries 视图）
+        self.closes = deque()            # 窗口内的有效收盘价
+        self.sorted = {w: [] for w in _SORTED_WINDOWS}
+        self.sums = {w: 0 for w in _MA_WINDOWS}
+        self.ret_n = 0                   # 有限收益率个数及其精确一阶 / 二阶和
+        self.ret_inf = 0
+        self.ret_s1 = 0
+        self.ret_s2 = 0
+        self.rsi_m = 0                   # 尾部涨跌幅个数（<= 1000），第一个作为递推初值
+        self.rsi_seed = (0, 0)
+        self.rsi_acc = [0, 0]            # Σ 13^(t-k) * 14^(k-s-1) * x_k，涨 / 跌各一份
+
+    @classmethod
+    def from_window(cls, window) -> "IndicatorState":
+        """从头构建，结果与逐根 update 完全相同"""
+        state = cls()
+        state.window = window
+        close = np.asarray(window["Close"], dtype=float)
+        close = close[~np.isnan(close)]
+        state.closes = deque(close.tolist())
+        for w in _SORTED_WINDOWS:
+            state.sorted[w] = sorted(close[-w:].tolist())
+        for w in _MA_WINDOWS:
+            state.sums[w] = sum(map(int, (close[-w:] * _ONE).tolist()))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rets = close[1:] / close[:-1] - 1
+        finite = np.isfinite(rets)
+        ints = list(map(int, (rets[finite] * _ONE).tolist()))
+        state.ret_n = len(ints)
+        state.ret_inf = int(np.count_nonzero(np.isinf(rets)))
+        state.ret_s1 = sum(ints)
+        state.ret_s2 = sum(x * x for x in ints)
+
+        delta = np.diff(close[-(_RSI_TAIL + 1):])
+        if len(delta):
+            gains = list(map(int, (np.maximum(delta, 0.0) * _ONE).tolist()))
+            losses = list(map(int, (np.maximum(-delta, 0.0) * _ONE).tolist()))
+            acc_g = acc_l = 0
+            for k in range(1, len(delta)):
+                p = _p14(k - 1)
+                acc_g = 13 * acc_g + p * gains[k]
+                acc_l = 13 * acc_l + p * losses[k]
+            state.rsi_m = len(delta)
+            state.rsi_seed = (gains[0], losses[0])
+            state.rsi_acc = [acc_g, acc_l]
+        return state
+
+    # ---- Wilder 尾部：第 s 个涨跌幅为初值，avg_t = (13^(t-s) * x_s + acc) / 14^(t-s) ----
+
+    def _delta(self, i: int) -> tuple[int, int]:
+        """第 i 个涨跌幅（closes[i + 1] - closes[i]）"""
+        return _gain_loss(self.closes[i], self.closes[i + 1])
+
+    def _tail_push_back(self, x: tuple[int, int]):
+        m = self.rsi_m
+        if m == 0:
+            self.rsi_seed = x
+        else:
+            k = _p14(m - 1)
+            self.rsi_acc = [13 * a + k * v for a, v in zip(self.rsi_acc, x)]
+        self.rsi_m = m + 1
+
+    def _tail_pop_back(self, x: tuple[int, int]):
+        m = self.rsi_m - 1
+        self.rsi_m = m
+        if m <= 1:
+            self.rsi_acc = [0, 0]
+            if m == 0:
+                self.rsi_seed = (0, 0)
+            return
+        k = _p14(m - 1)
+        self.rsi_acc = [(a - k * v) // 13 for a, v in zip(self.rsi_acc, x)]
+
+    def _tail_pop_front(self):
+        m = self.rsi_m
+        if m == 1:
+            self.rsi_m, self.rsi_seed, self.rsi_acc = 0, (0, 0), [0, 0]
+            return
+        x = self._delta(len(self.closes) - 1 - m + 1)
+        k = _p13(m - 2)
+        self.rsi_acc = [(a - k * v) // 14 for a, v in zip(self.rsi_acc, x)]
+        self.rsi_seed = x
+        self.rsi_m = m - 1
+
+    def _tail_push_front(self, x: tuple[int, int]):
+        m = self.rsi_m
+        if m:
+            k = _p13(m - 1)
+            self.rsi_acc = [14 * a + k * s for a, s in zip(self.rsi_acc, self.rsi_seed)]
+        self.rsi_seed = x
+        self.rsi_m = m + 1
+
+    # ---- 收益率矩 ----
+
+    def _add_return(self, prev: float, cur: float, sign: int):
+        r = _return(prev, cur)
+        if r != r:
+            return
+        if math.isinf(r):
+            self.ret_inf += sign
+            return
+        x = _fixed(r)
+        self.ret_n += sign
+        self.ret_s1 += sign * x
+        self.ret_s2 += sign * x * x
+
+    # ---- 有效收盘价序列的三种变化 ----
+
+    def _push_close(self, c: float):
+        closes = self.closes
+        closes.append(c)
+        n = len(closes)
+        if n >= 2:
+            prev = closes[-2]
+            self._add_return(prev, c, 1)
+            self._tail_push_back(_gain_loss(prev, c))
+            if self.rsi_m > _RSI_TAIL:
+                self._tail_pop_front()
+        for w, values in self.sorted.items():
+            insort(values, c)
+            if n > w:
+                del values[bisect_left(values, closes[-(w + 1)])]
+        for w in _MA_WINDOWS:
+            self.sums[w] += _fixed(c) - (_fixed(closes[-(w + 1)]) if n > w else 0)
+
+    def _pop_close(self):
+        closes = self.closes
+        n = len(closes)
+        c = closes[-1]
+        for w, values in self.sorted.items():
+            del values[bisect_left(values, c)]
+            if n > w:
+                insort(values, closes[-(w + 1)])
+        for w in _MA_WINDOWS:
+            self.sums[w] -= _fixed(c) - (_fixed(closes[-(w + 1)]) if n > w else 0)
+        if n >= 2:
+            prev = closes[-2]
+            self._add_return(prev, c, -1)
+            self._tail_pop_back(_gain_loss(prev, c))
+        closes.pop()
+        # 尾部不足 1000 个时从前面补回一个涨跌幅
+        start = len(closes) - 1 - self.rsi_m
+        if self.rsi_m < _RSI_TAIL and start > 0:
+            self._tail_push_front(self._delta(start - 1))
+
+    def _popleft_close(self):
+        closes = self.closes
+        n = len(closes)
+        c = closes[0]
+        for w, values in self.sorted.items():
+            if n <= w:
+                del values[bisect_left(values, c)]
+        for w in _MA_WINDOWS:
+            if n <= w:
+                self.sums[w] -= _fixed(c)
+        if n >= 2:
+            self._add_return(c, closes[1], -1)
+            if self.rsi_m == n - 1:
+                self._tail_pop_front()
+        closes.popleft()
+
+    # ---- 窗口推进 ----
+
+    def update(self, window) -> bool:
+        """
+        推进到新窗口；新窗口必须是旧窗口向后滑动（起点不早于旧起点、包含旧的最后一根且重叠部分未被改写）
+        最后一根允许被修订（盘中价格），否则返回 False，由调用方重建
+        """
+        old = self.window
+        if old is None or old.empty or window.empty:
+            return False
+        last_day = old.days[-1]
+        i = int(np.searchsorted(window.days, last_day))
+        j = int(np.searchsorted(old.days, window.days[0]))
+        if i == len(window) or window.days[i] != last_day or j == len(old) or old.days[j] != window.days[0]:
+            return False
+        # 重叠部分的首根与倒数第二根不变，才认为历史没有被复权改写
+        if not self._same_bar(old, j, window, 0) or (i > 0 and not self._same_bar(old, len(old) - 2, window, i - 1)):
+            return False
+
+        close = old["Close"]
+        for c in close[:j].tolist():
+            if c == c:
+                self._popleft_close()
+        if not self._same_bar(old, len(old) - 1, window, i):
+            if close[-1] == close[-1]:
+                self._pop_close()
+            c = float(window["Close"][i])
+            if c == c:
+                self._push_close(c)
+        for c in window["Close"][i + 1:].tolist():
+            if c == c:
+                self._push_close(c)
+        self.window = window
+        return True
+
+    @staticmethod
+    def _same_bar(a, i: int, b, j: int) -> bool:
+        x = (a.days[i], a.high[i], a.low[i], a.close[i])
+        y = (b.days[j], b.high[j], b.low[j], b.close[j])
+        return all(u == v or (u != u and v != v) for u, v in zip(x, y))
+
+    # ---- 快照 ----
+
+    def _rsi(self, lag: int) -> float:
+        """倒数第 lag + 1 个 RSI（lag 为 0 或 1）"""
+        m = self.rsi_m - lag
+        if m < 1:
+            return math.nan
+        acc = self.rsi_acc
+        if lag:
+            last = self._delta(len(self.closes) - 2)
+            k = _p14(m - 1)
+            acc = [(a - k * v) // 13 for a, v in zip(acc, last)] if m > 1 else [0, 0]
+        p = _p13(m - 1)
+        gain = p * self.rsi_seed[0] + acc[0]
+        loss = p * self.rsi_seed[1] + acc[1]
+        return 100 * gain / (gain + loss) if loss else math.nan
+
+    def snapshot(self) -> dict:
+        """与 compute_indicators 相同的字段"""
+        closes = self.closes
+        n = len(closes)
+        nan = math.nan
+        last = closes[-1]
+
+        rsi = self._rsi(0)
+        rsi_prev = self._rsi(1)
+        rsi_turn_up = rsi == rsi and rsi_prev == rsi_prev and rsi > rsi_prev
+
+        peak = self.sorted[252][-1]
+        dd = (last - peak) / peak if min(n, 252) >= 50 else nan
+
+        vol = nan
+        count = self.ret_n + self.ret_inf
+        if count >= 50:
+            if not self.ret_inf:
+                k = self.ret_n
+                var = (k * self.ret_s2 - self.ret_s1 * self.ret_s1) / ((k * (k - 1)) << (2 * _SCALE))
+                vol = math.sqrt(var) * math.sqrt(252)
+
+        def pct(w):
+            if n < w:
+                return nan
+            values = self.sorted[w]
+            less = bisect_left(values, last)
+            return _pct_rank(less, bisect_right(values, last) - less, w)
+
+        def ma(w):
+            return self.sums[w] / (w << _SCALE) if n >= w else nan
+
+        tail = self.window.tail(15)
+        return {
+            "Last": last,
+            "RSI": rsi,
+            "RSITurnUp": bool(rsi_turn_up),
+            "Pct3Y": pct(756),
+            "Pct5Y": pct(1260),
+            "MA50": ma(50),
+            "MA200": ma(200),
+            "ATR14": _atr_last(np.asarray(tail.high, dtype=float), np.asarray(tail.low, dtype=float),
+                               np.asarray(tail.close, dtype=float)),
+            "DD1Y": dd,
+            "Vol": vol,
+        }
+
+
+_states: "OrderedDict[tuple, IndicatorState]" = OrderedDict()
+
+
+def window_indicators(key: tuple, window) -> dict:
+    """
+    key（如 (ticker, years)）对应窗口的指标：已有状态时增量推进，否则从头构建
+    在事件循环线程内同步执行，无需加锁
+    """
+    state = _states.pop(key, None)
+    if state is None or not state.update(window):
+        state = IndicatorState.from_window(window)
+    _states[key] = state
+    while len(_states) > INDICATOR_STATE_MAX:
+        _states.popitem(last=False)
+    return state.snapshot()
@@ -2,6 +2,7 @@
 技术指标计算模块
 """
 import math
+from bisect import bisect_left, bisect_right, insort
 import pandas as pd
 import numpy as np
 
@@ -17,50 +18,242 @@ def rsi_wilder(close: pd.Series, period: int = 14) -> pd.Series:
     return 100 - (100 / (1 + rs))
 
 
-def pct_rank_window(close: pd.Series, window: int) -> float:
-    """计算价格在窗口内的分位数"""
-    if len(close) < window:
-        return float("nan")
-    w = close.iloc[-window:]
-    return w.rank(pct=True).iloc[-1].item()
+# RSI 的 Wilder 平滑权重按 (1 - 1/14)^k 衰减，1000 根之前的贡献 < 1e-30，可忽略
+_RSI_TAIL = 1000
 
 
-def ma(series: pd.Series, n: int) -> float:
-    """计算移动平均线"""
-    if len(series) < n:
-        return float("nan")
-    return float(series.rolling(n).mean().iloc[-1])
+def _ewm_tail(x: np.ndarray, alpha: float) -> np.ndarray:
+    """ewm(alpha, adjust=False) 的闭式向量化计算，y0 = x0"""
+    b = 1.0 - alpha
+    k = np.arange(len(x), dtype=float)
+    scaled = x * b ** -k
+    scaled[0] = 0.0
+    return b ** k * (x[0] + alpha * np.cumsum(scaled))
 
 
-def annualized_vol(close: pd.Series) -> float:
-    """计算年化波动率"""
-    rets = close.pct_change().dropna()
-    if len(rets) < 50:
-        return float("nan")
-    return float(rets.std() * math.sqrt(252))
+def _values(data, column: str) -> np.ndarray:
+    """列的 float64 数组：data 可以是 DataFrame，也可以是 PriceSeries"""
+    return np.asarray(data[column], dtype=float)
+
 
+def _pct_rank(less: int, equal: int, size: int) -> float:
+    """平均名次分位：less 个更小值、equal 个相等值（含自身），窗口长度 size"""
+    return float((less + (equal + 1) / 2) / size)
 
-def drawdown_1y(close: pd.Series) -> float:
-    """计算近1年回撤（负数）"""
-    w = close.tail(252)
-    if len(w) < 50:
+
+def _pct_rank_last(window: np.ndarray) -> float:
+    """窗口内最后一个值的分位（与 rank(pct=True) 的平均名次一致）"""
+    v = window[-1]
+    return _pct_rank(np.count_nonzero(window < v), np.count_nonzero(window == v), len(window))
+
+
+def _atr_last(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> float:
+    """
+    最后一根的 ATR14；参数为原始行（含 NaN）的最后 15 根，不足 14 根为 NaN
+    只有 14 根时第一根没有前收盘，真实波幅为 NaN
+    """
+    if len(close) < 14:
         return float("nan")
-    peak = w.max()
-    last = w.iloc[-1]
-    return float((last - peak) / peak)  # negative
+    prev_close = np.concatenate(([np.nan], close[:-1])) if len(close) == 14 else close[:-1]
+    high, low = high[-14:], low[-14:]
+    with np.errstate(invalid="ignore"):
+        tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    return float("nan") if np.isnan(tr).any() else float(tr.mean())
 
 
-def atr(df: pd.DataFrame, n: int = 14) -> float:
-    """计算平均真实波幅 (ATR)"""
-    high = df["High"].astype(float)
-    low = df["Low"].astype(float)
-    close = df["Close"].astype(float)
-    prev_close = close.shift(1)
+def compute_indicators(df) -> dict:
+    """
+    一次性计算 signal_abc / risk_level / buy_zones 需要的全部指标
+    df 为 DataFrame 或 PriceSeries，只转换一次为连续 NumPy 数组，每个指标只计算需要的窗口
+    """
+    close_all = np.ascontiguousarray(_values(df, "Close"))
+    close = close_all[~np.isnan(close_all)]
+    n = len(close)
+    nan = float("nan")
+    last = float(close[-1])
+
+    # RSI (Wilder)，只在尾部窗口上递推
+    rsi_last, rsi_turn_up = nan, False
+    tail = close[-(_RSI_TAIL + 1):]
+    if len(tail) >= 2:
+        delta = np.diff(tail)
+        avg_gain = _ewm_tail(np.clip(delta, 0, None), 1 / 14)
+        avg_loss = _ewm_tail(np.clip(-delta, 0, None), 1 / 14)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100 - 100 / (1 + avg_gain / np.where(avg_loss == 0, np.nan, avg_loss))
+        rsi_last = float(rsi[-1])
+        valid = rsi[~np.isnan(rsi)]
+        rsi_turn_up = bool(len(valid) >= 2 and valid[-1] > valid[-2])
+
+    # 1 年回撤与年化波动率
+    w = close[-252:]
+    dd = float((last - w.max()) / w.max()) if len(w) >= 50 else nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets = close[1:] / close[:-1] - 1
+    rets = rets[~np.isnan(rets)]
+    vol = float(np.std(rets, ddof=1) * math.sqrt(252)) if len(rets) >= 50 else nan
+
+    # ATR14：只取最后 15 根计算真实波幅
+    atr14 = _atr_last(_values(df, "High")[-15:], _values(df, "Low")[-15:], close_all[-15:])
+
+    return {
+        "Last": last,
+        "RSI": rsi_last,
+        "RSITurnUp": rsi_turn_up,
+        "Pct3Y": _pct_rank_last(close[-756:]) if n >= 756 else nan,
+        "Pct5Y": _pct_rank_last(close[-1260:]) if n >= 1260 else nan,
+        "MA50": float(close[-50:].mean()) if n >= 50 else nan,
+        "MA200": float(close[-200:].mean()) if n >= 200 else nan,
+        "ATR14": atr14,
+        "Vol": vol,
+        "DD1Y": dd,
+    }
+
+
+def right_align(matrix: np.ndarray) -> tuple:
+    """
+    把每行的有效值（非 NaN）按原顺序移到行尾，相当于逐行 dropna 后右对齐
+    返回 (对齐后的矩阵, 每行有效值个数)
+    """
+    valid = ~np.isnan(matrix)
+    order = np.argsort(valid, axis=1, kind="stable")
+    return np.take_along_axis(matrix, order, axis=1), valid.sum(axis=1)
+
+
+def compute_indicators_matrix(close: np.ndarray) -> dict:
+    """
+    横截面指标：close 为 股票 × 交易日 的收盘价矩阵（缺失为 NaN）
+    一次向量化计算所有股票的 RSI、3Y/5Y 分位、MA50/MA200、波动率和 1 年回撤，
+    每行结果与对该行调用 compute_indicators 一致（不含 ATR）
+    """
+    c, n = right_align(np.asarray(close, dtype=float))
+    rows, days = c.shape
+    nan = np.nan
+    last = c[:, -1]
 
+    # RSI (Wilder)：尾部窗口上按闭式解递推，每行从第一个有效差分开始
+    delta = np.diff(c[:, -(_RSI_TAIL + 1):], axis=1)
+    t = delta.shape[1]
+    rsi_last = np.full(rows, nan)
+    rsi_turn_up = np.zeros(rows, dtype=bool)
+    if t >= 1:
+        ok = ~np.isnan(delta)
+        first = np.where(ok.any(axis=1), ok.argmax(axis=1), t)
+        k = np.arange(t, dtype=float)
+        b = 1.0 - 1 / 14
+        started = k[None, :] >= first[:, None]
+        has_start = first < t
+
+        def wilder(x):
+            z = np.where(started, np.nan_to_num(x), 0.0) * b ** -k
+            # 首个有效值作为初值：y_f = x_f
+            z[has_start, first[has_start]] *= 14
+            return np.where(started, b ** k * np.cumsum(z, axis=1) / 14, nan)
+
+        avg_gain = wilder(np.clip(delta, 0, None))
+        avg_loss = wilder(np.clip(-delta, 0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100 - 100 / (1 + avg_gain / np.where(avg_loss == 0, nan, avg_loss))
+        rsi_last = rsi[:, -1]
+
+        # RSI 拐头：每行最后两个有效 RSI 比较
+        pos = np.where(~np.isnan(rsi), np.arange(t), -1)
+        i1 = pos.max(axis=1)
+        pos[np.arange(rows), np.maximum(i1, 0)] = -1
+        i2 = pos.max(axis=1)
+        rsi_turn_up = (i2 >= 0) & (rsi[np.arange(rows), i1] > rsi[np.arange(rows), i2])
+
+    def pct_rank(w: int) -> np.ndarray:
+        win = c[:, -w:]
+        less = (win < last[:, None]).sum(axis=1)
+        equal = (win == last[:, None]).sum(axis=1)
+        return np.where(n >= w, (less + (equal + 1) / 2) / w, nan)
+
+    # 1 年回撤
+    w = c[:, -252:]
+    with np.errstate(invalid="ignore"):
+        peak = np.where(np.isnan(w), -np.inf, w).max(axis=1)
+        dd = np.where(np.minimum(n, 252) >= 50, (last - peak) / peak, nan)
+
+    # 年化波动率（全历史收益率，ddof=1）
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets = c[:, 1:] / c[:, :-1] - 1
+        rets_n = (~np.isnan(rets)).sum(axis=1)
+        mean = np.nansum(rets, axis=1) / rets_n
+        var = np.nansum((rets - mean[:, None]) ** 2, axis=1) / (rets_n - 1)
+    vol = np.where(rets_n >= 50, np.sqrt(var) * math.sqrt(252), nan)
+
+    return {
+        "Last": last,
+        "RSI": rsi_last,
+        "RSITurnUp": rsi_turn_up,
+        "Pct3Y": pct_rank(756),
+        "Pct5Y": pct_rank(1260),
+        "MA50": c[:, -50:].mean(axis=1) if days >= 50 else np.full(rows, nan),
+        "MA200": c[:, -200:].mean(axis=1) if days >= 200 else np.full(rows, nan),
+        "Vol": vol,
+        "DD1Y": dd,
+    }
+
+
+def rolling_pct_rank(close, windows=(756, 1260)) -> tuple:
+    """
+    逐日窗口分位序列（与 compute_indicators 的 Pct3Y / Pct5Y 口径一致，窗口不足为 NaN）
+    每个窗口维护一个有序列表：二分查找 O(log w) 定位名次，进出窗口各一次插入/删除，
+    插入/删除是 O(w) 的指针 memmove（常数很小，w = 1260 时约 10KB），每天合计 O(w)；
+    多个窗口在同一次遍历中更新；返回与 windows 顺序对应的数组
+    """
+    values = np.asarray(close, dtype=float).tolist()
+    outs = [np.full(len(values), np.nan) for _ in windows]
+    sorted_windows = [[] for _ in windows]
+    for i, v in enumerate(values):
+        for w, sw, out in zip(windows, sorted_windows, outs):
+            insort(sw, v)
+            if i >= w:
+                del sw[bisect_left(sw, values[i - w])]
+            if i >= w - 1:
+                less = bisect_left(sw, v)
+                out[i] = (less + (bisect_right(sw, v) - less + 1) / 2) / w
+    return tuple(outs)
+
+
+def compute_indicator_series(df) -> pd.DataFrame:
+    """
+    逐日指标序列：每一天只使用当天及之前的数据（无未来函数），
+    最后一行与 compute_indicators 的结果一致；索引为 Close 非空的交易日
+    df 为 DataFrame 或 PriceSeries
+    """
+    close_all = _values(df, "Close")
+    valid = ~np.isnan(close_all)
+    index = df.index[valid]
+    close = pd.Series(close_all[valid], index=index)
+    high = pd.Series(_values(df, "High")[valid], index=index)
+    low = pd.Series(_values(df, "Low")[valid], index=index)
+
+    rsi = rsi_wilder(close, 14)
+    rsi_valid = rsi.dropna()
+    turn_up = (rsi_valid > rsi_valid.shift(1)).reindex(close.index).ffill()
+    turn_up = turn_up.where(turn_up.notna(), False).astype(bool)
+
+    prev_close = close.shift(1)
     tr = pd.concat(
         [(high - low), (high - prev_close).abs(), (low - prev_close).abs()],
         axis=1
     ).max(axis=1)
 
-    v = tr.rolling(n).mean().iloc[-1]
-    return float(v) if pd.notna(v) else float("nan")
+    rets = close.pct_change()
+    peak = close.rolling(252, min_periods=50).max()
+    pct_3y, pct_5y = rolling_pct_rank(close.to_numpy(), (756, 1260))
+
+    return pd.DataFrame({
+        "Last": close,
+        "RSI": rsi,
+        "RSITurnUp": turn_up,
+        "Pct3Y": pct_3y,
+        "Pct5Y": pct_5y,
+        "MA50": close.rolling(50).mean(),
+        "MA200": close.rolling(200).mean(),
+        "ATR14": tr.rolling(14).mean(),
+        "Vol": rets.expanding(min_periods=50).std() * math.sqrt(252),
+        "DD1Y": (close - peak) / peak,
+    }, index=close.index)
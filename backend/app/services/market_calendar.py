@@ -0,0 +1,213 @@
+"""
+exchange trading calendars: when can a daily bar appear or change
+
+a ticker's market comes from its suffix the way Stooq reads it (no suffix means
+US, e.g. goog -> goog.us); bars only change on trading days, from the open
+(providers serve a live partial bar) until MARKET_SETTLE seconds after the close
+(the final bar is published); outside those windows cached history stays valid
+US holidays are derived from the NYSE rules; other markets only know weekends,
+so they are refreshed on every weekday (never stale, just less savings)
+"""
+import os
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from functools import lru_cache
+from typing import Callable, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+# after the close providers may still publish or revise the day's final bar
+MARKET_SETTLE = float(os.getenv("MARKET_SETTLE", 3600))
+# how far ahead to look for the next session (covers any run of holidays)
+_MAX_GAP_DAYS = 14
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th weekday (Mon=0) of a month; n=-1 for the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l_ = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l_) // 433
+    month = (h + l_ - 7 * m + 90) // 25
+    return date(year, month, (h + l_ - 7 * m + 33 * month + 19) % 32)
+
+
+def _observed(day: date) -> date:
+    """a holiday on Saturday is observed on Friday, one on Sunday on Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=64)
+def nyse_holidays(year: int) -> frozenset:
+    """full-day NYSE closures of a year"""
+    days = {
+        _nth_weekday(year, 1, 0, 3),                # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),                # Washington's Birthday
+        _easter(year) - timedelta(days=2),          # Good Friday
+        _nth_weekday(year, 5, 0, -1),               # Memorial Day
+        _observed(date(year, 7, 4)),                # Independence Day
+        _nth_weekday(year, 9, 0, 1),                # Labor Day
+        _nth_weekday(year, 11, 3, 4),               # Thanksgiving
+        _observed(date(year, 12, 25)),              # Christmas
+    }
+    # New Year's Day on a Saturday is not observed on the Friday before
+    if date(year, 1, 1).weekday() != 5:
+        days.add(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))      # Juneteenth
+    return frozenset(days)
+
+
+@lru_cache(maxsize=64)
+def nyse_early_closes(year: int) -> frozenset:
+    """13:00 closes: the day before Independence Day, Black Friday, Christmas Eve"""
+    days = {
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24),
+    }
+    return frozenset(d for d in days if d.weekday() < 5 and d not in nyse_holidays(year))
+
+
+def _no_holidays(year: int) -> frozenset:
+    return frozenset()
+
+
+class Market(NamedTuple):
+    name: str
+    tz: ZoneInfo
+    open: dtime
+    close: dtime
+    holidays: Callable[[int], frozenset] = _no_holidays
+    early_closes: Callable[[int], frozenset] = _no_holidays
+    early_close: Optional[dtime] = None
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays(day.year)
+
+    def session(self, day: date) -> tuple:
+        """(open, close) of a trading day as aware datetimes"""
+        close = self.early_close if day in self.early_closes(day.year) else self.close
+        return (datetime.combine(day, self.open, self.tz),
+                datetime.combine(day, close, self.tz))
+
+
+US = Market("XNYS", ZoneInfo("America/New_York"), dtime(9, 30), dtime(16, 0),
+            nyse_holidays, nyse_early_closes, dtime(13, 0))
+LSE = Market("XLON", ZoneInfo("Europe/London"), dtime(8, 0), dtime(16, 30))
+XETRA = Market("XETR", ZoneInfo("Europe/Berlin"), dtime(9, 0), dtime(17, 30))
+TSE = Market("XTKS", ZoneInfo("Asia/Tokyo"), dtime(9, 0), dtime(15, 30))
+HKEX = Market("XHKG", ZoneInfo("Asia/Hong_Kong"), dtime(9, 30), dtime(16, 0))
+
+# Stooq market suffixes, plus the Yahoo ones for the same exchanges
+MARKETS = {
+    "us": US,
+    "uk": LSE, "l": LSE,
+    "de": XETRA,
+    "jp": TSE, "t": TSE,
+    "hk": HKEX,
+}
+
+
+def market_for(ticker: str) -> Optional[Market]:
+    """exchange of a ticker, None for a suffix without a known calendar"""
+    symbol = ticker.lower()
+    if "." not in symbol:
+        return US
+    return MARKETS.get(symbol.rsplit(".", 1)[1])
+
+
+def _sessions(market: Market, around: datetime, step: int):
+    """trading sessions from the local day of `around` onwards (step=1) or backwards (step=-1)"""
+    day = around.astimezone(market.tz).date()
+    for _ in range(_MAX_GAP_DAYS):
+        if market.is_trading_day(day):
+            yield day, market.session(day)
+        day += timedelta(days=step)
+
+
+def _now(now: Optional[float]) -> datetime:
+    return datetime.fromtimestamp(time.time() if now is None else now, timezone.utc)
+
+
+def next_bar_change(ticker: str, now: float = None) -> Optional[float]:
+    """
+    earliest time (epoch seconds) the ticker's daily bars can change: now while a
+    session or its settle window is running, else the next open
+    None if the market has no known calendar
+    """
+    market = market_for(ticker)
+    if market is None:
+        return None
+    current = _now(now)
+    settle = timedelta(seconds=MARKET_SETTLE)
+    for _, (opens, closes) in _sessions(market, current - settle, 1):
+        if current < opens:
+            return opens.timestamp()
+        if current < closes + settle:
+            return current.timestamp()
+    return None
+
+
+def settle_end(ticker: str, now: float = None) -> Optional[float]:
+    """
+    end (epoch seconds) of the running session's settle window, or of the next
+    session's when none is running: from then on the day's bar is final
+    None if the market has no known calendar
+    """
+    market = market_for(ticker)
+    if market is None:
+        return None
+    current = _now(now)
+    settle = timedelta(seconds=MARKET_SETTLE)
+    for _, (_, closes) in _sessions(market, current - settle, 1):
+        if current < closes + settle:
+            return (closes + settle).timestamp()
+    return None
+
+
+def last_bar_change(ticker: str, now: float = None) -> Optional[float]:
+    """
+    latest time (epoch seconds) the ticker's daily bars could have changed: now
+    during a session or its settle window, else the end of the last settle window
+    None if the market has no known calendar
+    """
+    market = market_for(ticker)
+    if market is None:
+        return None
+    current = _now(now)
+    settle = timedelta(seconds=MARKET_SETTLE)
+    for _, (opens, closes) in _sessions(market, current, -1):
+        if current >= closes + settle:
+            return (closes + settle).timestamp()
+        if current >= opens:
+            return current.timestamp()
+    return None
+
+
+def last_session_day(ticker: str, now: float = None) -> Optional[date]:
+    """trading day of the newest bar that must exist by now (its settle window has passed)"""
+    market = market_for(ticker)
+    if market is None:
+        return None
+    current = _now(now)
+    settle = timedelta(seconds=MARKET_SETTLE)
+    for day, (_, closes) in _sessions(market, current, -1):
+        if current >= closes + settle:
+            return day
+    return None
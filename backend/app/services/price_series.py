@@ -0,0 +1,114 @@
+"""
+compact array-backed price history
+"""
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+# DataFrame column -> PriceSeries slot
+_COLUMNS = {"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}
+
+
+def day_ordinal(date) -> int:
+    """days since 1970-01-01 for a date / timestamp / ISO string"""
+    return int(np.datetime64(pd.Timestamp(date).date(), "D").astype(np.int64))
+
+
+class PriceSeries:
+    """
+    daily OHLCV history as contiguous arrays: int32 day ordinals plus one float
+    array per column (float64, or float32 to halve the footprint)
+
+    it supports the read-only subset of the DataFrame interface the indicator code
+    uses: series["Close"] returns the column as an ndarray, `"Open" in series`,
+    len(series) and series.index (a DatetimeIndex built on demand)
+    """
+
+    __slots__ = ("days", "open", "high", "low", "close", "volume")
+
+    def __init__(self, days: np.ndarray, close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 open: Optional[np.ndarray] = None, volume: Optional[np.ndarray] = None):
+        self.days = days
+        self.close = close
+        self.high = high
+        self.low = low
+        self.open = open
+        self.volume = volume
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype=np.float64) -> "PriceSeries":
+        """build from an OHLCV DataFrame with a DatetimeIndex (intraday time and tz are dropped)"""
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        days = index.values.astype("datetime64[D]").astype(np.int32)
+
+        def column(name):
+            if name not in df.columns:
+                return None
+            return np.ascontiguousarray(pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=dtype))
+
+        return cls(days, column("Close"), column("High"), column("Low"), column("Open"), column("Volume"))
+
+    def astype(self, dtype) -> "PriceSeries":
+        """same bars with float columns in dtype; returns self when nothing changes"""
+        dtype = np.dtype(dtype)
+        if self.close.dtype == dtype:
+            return self
+
+        def cast(a):
+            return None if a is None else np.ascontiguousarray(a, dtype=dtype)
+        return PriceSeries(self.days, cast(self.close), cast(self.high), cast(self.low),
+                           cast(self.open), cast(self.volume))
+
+    def to_frame(self) -> pd.DataFrame:
+        data = {name: getattr(self, slot) for name, slot in _COLUMNS.items() if getattr(self, slot) is not None}
+        return pd.DataFrame(data, index=self.index)
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.days.astype("datetime64[D]"), name="Date")
+
+    @property
+    def columns(self) -> list:
+        return [name for name, slot in _COLUMNS.items() if getattr(self, slot) is not None]
+
+    @property
+    def empty(self) -> bool:
+        return len(self.days) == 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, slot).nbytes for slot in self.__slots__ if getattr(self, slot) is not None)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __contains__(self, name: str) -> bool:
+        slot = _COLUMNS.get(name)
+        return slot is not None and getattr(self, slot) is not None
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self:
+            raise KeyError(name)
+        return getattr(self, _COLUMNS[name])
+
+    def _take(self, sl: slice) -> "PriceSeries":
+        """positional slice; the arrays are views, nothing is copied"""
+        def part(a):
+            return None if a is None else a[sl]
+        return PriceSeries(self.days[sl], self.close[sl], self.high[sl], self.low[sl],
+                           part(self.open), part(self.volume))
+
+    def slice_from(self, start) -> "PriceSeries":
+        """bars on or after start"""
+        return self._take(slice(int(np.searchsorted(self.days, day_ordinal(start))), None))
+
+    def tail(self, n: int) -> "PriceSeries":
+        return self._take(slice(max(len(self) - n, 0), None))
+
+    def __repr__(self) -> str:
+        if self.empty:
+            return "PriceSeries(empty)"
+        first, last = self.days[[0, -1]].astype("datetime64[D]")
+        return f"PriceSeries({len(self)} bars {first}..{last}, {self.close.dtype})"
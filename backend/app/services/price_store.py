@@ -0,0 +1,158 @@
+"""
+persistent on-disk OHLCV store, shared by every worker process on the host
+
+one NumPy file per ticker holding a (6, n) float64 matrix, one contiguous row per
+field (day ordinal, Open, High, Low, Close, Volume), plus a small JSON sidecar
+recording which start date the stored history covers and when it was last synced
+with upstream
+
+workers map the file read-only, so a history one worker filled is read by the
+others zero-copy from the shared page cache; files are replaced atomically and a
+mapping keeps seeing the version it opened
+"""
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+import numpy as np
+import pandas as pd
+from loguru import logger
+from .price_series import PriceSeries
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): fills are only serialized within a process
+    fcntl = None
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+_ROWS = 1 + len(OHLCV_COLUMNS)
+_LOCK_POLL = 0.05
+
+STORE_DIR = Path(os.getenv(
+    "PRICE_STORE_DIR",
+    str(Path(__file__).resolve().parent.parent / "data" / "prices")
+))
+
+
+def _paths(ticker: str) -> tuple:
+    name = ticker.upper().replace("/", "_")
+    return STORE_DIR / f"{name}.npy", STORE_DIR / f"{name}.json"
+
+
+def to_matrix(series: PriceSeries) -> np.ndarray:
+    """stack a PriceSeries into the on-disk layout (missing columns are NaN)"""
+    matrix = np.full((_ROWS, len(series)), np.nan)
+    matrix[0] = series.days
+    for i, col in enumerate(OHLCV_COLUMNS, start=1):
+        if col in series:
+            matrix[i] = series[col]
+    return matrix
+
+
+def from_matrix(matrix: np.ndarray) -> PriceSeries:
+    """PriceSeries whose OHLCV arrays are views of the (mapped) matrix"""
+    return PriceSeries(matrix[0].astype(np.int32), close=matrix[4], high=matrix[2], low=matrix[3],
+                       open=matrix[1], volume=matrix[5])
+
+
+def _write_atomic(path: Path, write):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        write(fh)
+    os.replace(tmp, path)
+
+
+def read(ticker: str) -> Optional[PriceSeries]:
+    """map the stored history for a ticker read-only, None if nothing usable is stored"""
+    data_path, _ = _paths(ticker)
+    try:
+        matrix = np.load(data_path, mmap_mode="r")
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Failed to read stored prices for {ticker}: {e}")
+        return None
+    if matrix.ndim != 2 or matrix.shape[0] != _ROWS or matrix.shape[1] == 0:
+        # empty, or written by an older layout: treat as not stored
+        return None
+    return from_matrix(matrix)
+
+
+def meta(ticker: str) -> dict:
+    """sidecar of the stored history: start, last, synced (epoch seconds)"""
+    _, meta_path = _paths(ticker)
+    try:
+        with open(meta_path) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def coverage_start(ticker: str) -> Optional[str]:
+    """earliest start date the stored history was fetched for"""
+    return meta(ticker).get("start")
+
+
+def synced_at(ticker: str) -> float:
+    """when the stored history was last brought up to date with upstream (0 if unknown)"""
+    return float(meta(ticker).get("synced") or 0.0)
+
+
+def full_synced_at(ticker: str) -> float:
+    """when the whole stored history was last fetched from upstream (0 if unknown)"""
+    m = meta(ticker)
+    return float(m.get("full") or m.get("synced") or 0.0)
+
+
+def write(ticker: str, data, start: str, full: Optional[float] = None) -> PriceSeries:
+    """
+    replace the stored history for a ticker (DataFrame or PriceSeries) and map it back
+    `full` is when the history was last fetched in full (default: now)
+    """
+    series = data if isinstance(data, PriceSeries) else PriceSeries.from_frame(data)
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    data_path, meta_path = _paths(ticker)
+    _write_atomic(data_path, lambda fh: np.save(fh, to_matrix(series)))
+    last = str(series.days[-1:].astype("datetime64[D]")[0]) if len(series) else None
+    now = time.time()
+    sidecar = json.dumps({"start": start, "last": last, "synced": now, "full": full or now})
+    _write_atomic(meta_path, lambda fh: fh.write(sidecar.encode()))
+    return read(ticker)
+
+
+def append(ticker: str, stored: PriceSeries, delta: pd.DataFrame) -> PriceSeries:
+    """
+    merge newly fetched bars into the stored history and persist it
+    overlapping dates take the new values, so a revised last bar replaces the old one
+    """
+    new = PriceSeries.from_frame(delta)
+    keep = ~np.isin(stored.days, new.days)
+    merged = np.concatenate((to_matrix(stored)[:, keep], to_matrix(new)), axis=1)
+    merged = merged[:, np.argsort(merged[0], kind="stable")]
+    start = coverage_start(ticker) or str(merged[0, :1].astype(np.int64).astype("datetime64[D]")[0])
+    return write(ticker, from_matrix(merged), start, full=full_synced_at(ticker))
+
+
+@asynccontextmanager
+async def locked(ticker: str):
+    """
+    host-wide exclusive lock for filling one ticker: the first worker fetches while
+    the others wait and then read what it wrote instead of going upstream themselves
+    """
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    data_path, _ = _paths(ticker)
+    fd = os.open(data_path.with_suffix(".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        # poll instead of blocking a thread, so a cancelled waiter never leaves a flock pending
+        while fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(_LOCK_POLL)
+        yield
+    finally:
+        os.close(fd)  # also releases the flock
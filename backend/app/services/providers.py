@@ -0,0 +1,229 @@
+"""
+price provider scheduler: rolling latency / error stats, circuit breakers and hedged racing
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from loguru import logger
+from ..core.http_client import run_io
+from ..core.rate_limit import RateLimited, is_rate_limit_error, limiter
+from ..core.metrics import PROVIDER_FALLBACKS, PROVIDER_RATE_LIMITED, PROVIDER_REQUESTS, PROVIDER_SECONDS
+
+# (name, provider function, extra kwargs)
+ProviderCall = Tuple[str, Callable, dict]
+
+
+def is_valid_frame(df, min_rows: int) -> bool:
+    """a usable price frame: has a Close column and enough rows"""
+    return df is not None and not df.empty and "Close" in df.columns and len(df) >= min_rows
+
+
+class ProviderStats:
+    """rolling latency / outcome window and circuit breaker for one provider"""
+
+    def __init__(self, name: str, window: int, failure_threshold: int, cooldown: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._samples = deque(maxlen=window)  # (latency seconds, ok)
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        """
+        ok: the provider answered, even with no usable rows (an unknown or delisted
+        ticker says nothing about the provider); only errors count toward the breaker
+        """
+        with self._lock:
+            self._samples.append((latency, ok))
+            if ok:
+                self._consecutive_failures = 0
+                self._open_until = 0.0
+                return
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                if self._open_until <= time.monotonic():
+                    logger.warning(
+                        f"Circuit opened for {self.name} after {self._consecutive_failures} consecutive failures")
+                self._open_until = time.monotonic() + self.cooldown
+
+    def allow(self) -> bool:
+        """
+        closed circuit: always allowed
+        open circuit: rejected until the cooldown passes, then a single probe is let through
+        """
+        with self._lock:
+            if self._consecutive_failures < self.failure_threshold:
+                return True
+            now = time.monotonic()
+            if now < self._open_until:
+                return False
+            # half-open: keep the circuit open for everyone else while this call probes
+            self._open_until = now + self.cooldown
+            return True
+
+    def is_open(self) -> bool:
+        """whether calls are currently rejected (does not claim the half-open probe)"""
+        with self._lock:
+            return (self._consecutive_failures >= self.failure_threshold
+                    and time.monotonic() < self._open_until)
+
+    def latency_p95(self) -> Optional[float]:
+        with self._lock:
+            latencies = [lat for lat, ok in self._samples if ok]
+        if len(latencies) < 5:
+            return None
+        return float(np.percentile(latencies, 95))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+        is_open = self.is_open()
+        errors = sum(1 for _, ok in samples if not ok)
+        return {
+            "samples": len(samples),
+            "error_rate": errors / len(samples) if samples else 0.0,
+            "p95": self.latency_p95(),
+            "circuit_open": is_open,
+        }
+
+
+class ProviderScheduler:
+    """
+    race providers in priority order: the next healthy provider is started when the
+    current one fails or runs past its rolling p95 latency, and the first valid frame wins
+    every call first takes a token from the provider's shared rate limiter
+    """
+
+    def __init__(self):
+        self.window = int(os.getenv("PROVIDER_STATS_WINDOW", 100))
+        self.failure_threshold = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", 5))
+        self.cooldown = float(os.getenv("PROVIDER_COOLDOWN", 30))
+        self.default_hedge_delay = float(os.getenv("PROVIDER_HEDGE_DELAY", 2.0))
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def stats(self, name: str) -> ProviderStats:
+        with self._lock:
+            if name not in self._stats:
+                self._stats[name] = ProviderStats(name, self.window, self.failure_threshold, self.cooldown)
+            return self._stats[name]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            names = list(self._stats)
+        return {name: self.stats(name).snapshot() for name in names}
+
+    def hedge_delay(self, name: str) -> float:
+        p95 = self.stats(name).latency_p95()
+        return max(p95, 0.05) if p95 is not None else self.default_hedge_delay
+
+    def _timed_call(self, name: str, fn: Callable, ticker: str, start: str, kwargs: dict, min_rows: int):
+        """runs in a worker thread; stats are recorded even if the race was already won"""
+        t0 = time.perf_counter()
+        try:
+            df = fn(ticker, start, **kwargs)
+        except Exception as e:
+            self._record(name, time.perf_counter() - t0, "error")
+            if is_rate_limit_error(str(e)):
+                limiter.penalize(name)
+            raise
+        self._record(name, time.perf_counter() - t0, "ok" if is_valid_frame(df, min_rows) else "empty")
+        return df
+
+    def _record(self, name: str, latency: float, outcome: str):
+        self.stats(name).record(latency, outcome != "error")
+        PROVIDER_SECONDS.observe(latency, provider=name)
+        PROVIDER_REQUESTS.inc(provider=name, outcome=outcome)
+
+    async def _call(self, name: str, fn: Callable, ticker: str, start: str, kwargs: dict, min_rows: int):
+        await limiter.acquire(name)
+        return await run_io(self._timed_call, name, fn, ticker, start, kwargs, min_rows)
+
+    async def race(self, ticker: str, start: str, calls: Sequence[ProviderCall],
+                   min_rows: int = 260) -> Optional[Tuple[str, pd.DataFrame]]:
+        """
+        return (provider name, frame) for the first valid frame; if nothing usable came
+        back the last provider exception is re-raised, otherwise None is returned;
+        RateLimited is raised when every provider was skipped for lack of tokens
+        """
+        queue = list(calls)
+        # every circuit is open: still try them all rather than fail outright
+        force = all(self.stats(call[0]).is_open() for call in calls)
+
+        in_flight = {}
+        last_error = None
+        limited = []
+        last_name, last_launch = None, 0.0
+
+        def launch(reason: str = None) -> bool:
+            """
+            start the next provider whose circuit lets a call through; the breaker is
+            only asked here, so a half-open probe is claimed by the call that makes it
+            """
+            nonlocal last_name, last_launch
+            while queue:
+                name, fn, kwargs = queue.pop(0)
+                if force or self.stats(name).allow():
+                    break
+            else:
+                return False
+            if reason is not None:
+                PROVIDER_FALLBACKS.inc(provider=name, reason=reason)
+            task = asyncio.create_task(self._call(name, fn, ticker, start, kwargs, min_rows))
+            in_flight[task] = name
+            last_name, last_launch = name, time.monotonic()
+            return True
+
+        if not launch():
+            # another call claimed the last half-open probe meanwhile: try them all as above
+            force = True
+            queue = list(calls)
+            launch()
+        try:
+            while in_flight:
+                timeout = None
+                if queue:
+                    timeout = max(self.hedge_delay(last_name) - (time.monotonic() - last_launch), 0)
+                done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    slow = last_name
+                    if launch("hedge"):
+                        logger.info(f"{slow} slower than its p95 for {ticker}, hedging with {last_name}")
+                    continue
+                for task in done:
+                    name = in_flight.pop(task)
+                    try:
+                        df = task.result()
+                    except RateLimited as e:
+                        limited.append(e)
+                        PROVIDER_RATE_LIMITED.inc(provider=name)
+                        logger.info(f"Provider {name} skipped for {ticker}: no rate-limit token")
+                        continue
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"Provider {name} failed for {ticker}: {e}")
+                        continue
+                    if is_valid_frame(df, min_rows):
+                        return name, df
+                    logger.warning(f"Provider {name} returned no usable data for {ticker}")
+                if not in_flight and queue:
+                    launch("failure")
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        if last_error is not None:
+            raise last_error
+        if limited:
+            raise min(limited, key=lambda e: e.retry_after)
+        return None
+
+
+scheduler = ProviderScheduler()
@@ -1,54 +1,47 @@
 """
 风险评估模块
 """
+import numpy as np
 import pandas as pd
-from .indicators import ma, annualized_vol, drawdown_1y
+from .indicators import compute_indicators
 from ..utils.formatters import safe_float
 
+# 分档阈值（从高风险到低风险依次匹配）
+VOL_SCORES = ((0.60, 3), (0.45, 2), (0.30, 1))       # 年化波动率 > 阈值
+DD_SCORES = ((-0.40, 3), (-0.30, 2), (-0.15, 1))     # 1年回撤 < 阈值
+RISK_LEVELS = ((5, "🔴 High Risk"), (3, "🟡 Medium Risk"), (0, "🟢 Low Risk"))
 
-def risk_level(df: pd.DataFrame) -> dict:
+
+def risk_level(df: pd.DataFrame, ind: dict = None) -> dict:
     """
     风险评级：基于波动率、回撤、趋势
     分数越高风险越大
+    ind: compute_indicators 的结果，传入时不再重复计算
     """
-    close = df["Close"].dropna().astype(float)
+    if ind is None:
+        ind = compute_indicators(df)
 
-    last = float(close.iloc[-1])
-    ma50 = ma(close, 50)
-    ma200 = ma(close, 200)
+    last = ind["Last"]
+    ma50 = ind["MA50"]
+    ma200 = ind["MA200"]
     trend_up = (pd.notna(ma50) and pd.notna(ma200) and ma50 > ma200)
 
-    vol = annualized_vol(close)      # annualized
-    dd = drawdown_1y(close)          # negative
+    vol = ind["Vol"]      # annualized
+    dd = ind["DD1Y"]      # negative
 
     # 可解释风险分级：波动+回撤+趋势
     score = 0
 
     if pd.notna(vol):
-        if vol > 0.60:
-            score += 3
-        elif vol > 0.45:
-            score += 2
-        elif vol > 0.30:
-            score += 1
+        score += next((s for t, s in VOL_SCORES if vol > t), 0)
 
     if pd.notna(dd):
-        if dd < -0.40:
-            score += 3
-        elif dd < -0.30:
-            score += 2
-        elif dd < -0.15:
-            score += 1
+        score += next((s for t, s in DD_SCORES if dd < t), 0)
 
     if not trend_up:
         score += 1
 
-    if score >= 5:
-        lvl = "🔴 High Risk"
-    elif score >= 3:
-        lvl = "🟡 Medium Risk"
-    else:
-        lvl = "🟢 Low Risk"
+    lvl = next(label for floor, label in RISK_LEVELS if score >= floor)
 
     return {
         "Risk": lvl,
@@ -60,3 +53,18 @@ def risk_level(df: pd.DataFrame) -> dict:
         "DD1Y": safe_float(dd),
         "Last": last
     }
+
+
+def risk_level_arrays(vol: np.ndarray, dd: np.ndarray, trend_up: np.ndarray) -> tuple:
+    """
+    与 risk_level 相同的分级规则，对多只股票向量化计算
+    返回 (分数数组, 风险等级数组)
+    """
+    score = (
+        np.select([vol > t for t, _ in VOL_SCORES], [s for _, s in VOL_SCORES], 0)
+        + np.select([dd < t for t, _ in DD_SCORES], [s for _, s in DD_SCORES], 0)
+        + (~trend_up).astype(int)
+    )
+    labels = np.select([score >= floor for floor, _ in RISK_LEVELS], [label for _, label in RISK_LEVELS],
+                       RISK_LEVELS[-1][1])
+    return score, labels
@@ -0,0 +1,102 @@
+"""
+横截面选股：股票 × 交易日 价格矩阵上的向量化信号与风险计算
+"""
+import asyncio
+import os
+import numpy as np
+import pandas as pd
+from .data_loader import load_prices, history_start
+from .indicators import compute_indicators_matrix
+from .signals import signal_abc_arrays
+from .risk import risk_level_arrays
+from ..utils.formatters import safe_float
+from ..core.rate_limit import BATCH, priority
+
+
+def build_close_matrix(frames: dict) -> tuple:
+    """按交易日对齐收盘价，返回 (tickers, dates, 收盘价矩阵)，缺失为 NaN"""
+    tickers = list(frames)
+    if not tickers:
+        return tickers, pd.DatetimeIndex([]), np.empty((0, 0))
+    aligned = pd.concat({t: pd.Series(frames[t]["Close"], index=frames[t].index) for t in tickers},
+                        axis=1, sort=True)
+    return tickers, aligned.index, np.ascontiguousarray(aligned.to_numpy(dtype=float).T)
+
+
+def screen_matrix(close: np.ndarray) -> dict:
+    """所有股票一次计算 ABC 信号与风险分级，返回按列组织的结果（每列为数组）"""
+    ind = compute_indicators_matrix(close)
+    trend_up = ind["MA50"] > ind["MA200"]
+    sig, A, B, C = signal_abc_arrays(ind["Pct3Y"], ind["Pct5Y"], ind["RSI"], ind["RSITurnUp"])
+    score, risk = risk_level_arrays(ind["Vol"], ind["DD1Y"], trend_up)
+    return {
+        "Signal": sig, "Last": ind["Last"], "RSI": ind["RSI"], "Pct3Y": ind["Pct3Y"], "Pct5Y": ind["Pct5Y"],
+        "A_pos": A, "B_rsi": B, "C_turn": C,
+        "Risk": risk, "RiskScore": score, "TrendUp": trend_up,
+        "MA50": ind["MA50"], "MA200": ind["MA200"], "Vol": ind["Vol"], "DD1Y": ind["DD1Y"],
+    }
+
+
+def filter_mask(cols: dict, signals: list = None, min_risk_score: int = None, max_risk_score: int = None,
+                max_pct3y: float = None, max_pct5y: float = None, max_rsi: float = None,
+                trend_up: bool = None) -> np.ndarray:
+    """按条件筛选（未设置的条件不生效，NaN 视为不满足）"""
+    mask = np.ones(len(cols["Signal"]), dtype=bool)
+    if signals:
+        mask &= np.isin(cols["Signal"], signals)
+    if min_risk_score is not None:
+        mask &= cols["RiskScore"] >= min_risk_score
+    if max_risk_score is not None:
+        mask &= cols["RiskScore"] <= max_risk_score
+    if max_pct3y is not None:
+        mask &= cols["Pct3Y"] <= max_pct3y
+    if max_pct5y is not None:
+        mask &= cols["Pct5Y"] <= max_pct5y
+    if max_rsi is not None:
+        mask &= cols["RSI"] <= max_rsi
+    if trend_up is not None:
+        mask &= cols["TrendUp"] == trend_up
+    return mask
+
+
+def _row(ticker: str, cols: dict, i: int) -> dict:
+    row = {"Ticker": ticker}
+    for key, values in cols.items():
+        v = values[i]
+        if isinstance(v, (np.bool_, bool)):
+            row[key] = bool(v)
+        elif isinstance(v, (np.integer, int)):
+            row[key] = int(v)
+        elif isinstance(v, str):
+            row[key] = v
+        else:
+            row[key] = safe_float(v)
+    return row
+
+
+def _screen(frames: dict, errors: dict, **filters) -> dict:
+    """对齐、计算并筛选（阻塞，CPU 密集）"""
+    names, _, close = build_close_matrix(frames)
+    if not names:
+        return {"scanned": 0, "matched": 0, "results": [], "errors": errors}
+    cols = screen_matrix(close)
+    # 至少需要约 1 年数据，与单只分析一致
+    enough = (~np.isnan(close)).sum(axis=1) >= 260
+    for i in np.flatnonzero(~enough):
+        errors[names[i]] = "data not enough or failed to load"
+    matched = np.flatnonzero(enough & filter_mask(cols, **filters))
+    return {
+        "scanned": int(enough.sum()),
+        "matched": len(matched),
+        "results": [_row(names[i], cols, i) for i in matched],
+        "errors": errors,
+    }
+
+
+async def run_screener(tickers: list, years: int, **filters) -> dict:
+    """加载股票池价格，在线程中构建矩阵并筛选，不阻塞事件循环"""
+    concurrency = int(os.getenv("BATCH_FETCH_CONCURRENCY", 8))
+    # 批量拉取让出限流配额给单只分析请求
+    with priority(BATCH):
+        frames, errors = await load_prices(tickers, history_start(years), concurrency)
+    return await asyncio.to_thread(_screen, frames, errors, **filters)
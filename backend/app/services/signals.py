@@ -1,37 +1,39 @@
 """
 信号生成逻辑模块
 """
+import numpy as np
 import pandas as pd
-from .indicators import rsi_wilder, pct_rank_window
+from .indicators import compute_indicators
 
+PCT_LOW = 0.30   # A：3Y/5Y 分位低于该值
+RSI_COLD = 35    # B：RSI 低于该值
 
-def signal_abc(df: pd.DataFrame) -> dict:
+
+def signal_abc(df: pd.DataFrame, ind: dict = None) -> dict:
     """
     ABC 信号系统：
     A: 位置偏低（分位低）
     B: 情绪偏冷（RSI低）
     C: 回暖（RSI拐头向上）
+    ind: compute_indicators 的结果，传入时不再重复计算
     """
-    close = df["Close"].dropna().astype(float)
-    rsi = rsi_wilder(close, 14)
+    if ind is None:
+        ind = compute_indicators(df)
 
-    last = float(close.iloc[-1])
-    rsi_last = float(rsi.iloc[-1])
+    last = ind["Last"]
+    rsi_last = ind["RSI"]
 
-    pr_3y = pct_rank_window(close, 756)   # ~3y
-    pr_5y = pct_rank_window(close, 1260)  # ~5y
+    pr_3y = ind["Pct3Y"]   # ~3y
+    pr_5y = ind["Pct5Y"]   # ~5y
 
     # A：位置偏低（分位低）
-    A = (pd.notna(pr_3y) and pr_3y < 0.30) or (pd.notna(pr_5y) and pr_5y < 0.30)
+    A = (pd.notna(pr_3y) and pr_3y < PCT_LOW) or (pd.notna(pr_5y) and pr_5y < PCT_LOW)
 
     # B：情绪偏冷（RSI低）
-    B = (rsi_last < 35)
+    B = (rsi_last < RSI_COLD)
 
     # C：回暖（RSI拐头向上）
-    rsi_dropna = rsi.dropna()
-    C = False
-    if len(rsi_dropna) >= 2:
-        C = float(rsi_dropna.iloc[-1]) > float(rsi_dropna.iloc[-2])
+    C = ind["RSITurnUp"]
 
     if A and B and C:
         sig = "Adding to a Position"
@@ -52,3 +54,19 @@ def signal_abc(df: pd.DataFrame) -> dict:
         "B_rsi": B,
         "C_turn": C
     }
+
+
+def signal_abc_arrays(pr_3y: np.ndarray, pr_5y: np.ndarray, rsi: np.ndarray, turn_up: np.ndarray) -> tuple:
+    """
+    与 signal_abc 相同的规则，对多只股票向量化计算（NaN 视为不满足条件）
+    返回 (信号数组, A, B, C)
+    """
+    A = (pr_3y < PCT_LOW) | (pr_5y < PCT_LOW)
+    B = rsi < RSI_COLD
+    C = turn_up.astype(bool)
+    sig = np.select(
+        [A & B & C, A & B, A | B],
+        ["Adding to a Position", "Building a Position", "Probing"],
+        "Observation"
+    )
+    return sig, A, B, C
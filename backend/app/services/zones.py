@@ -3,31 +3,53 @@
 """
 import pandas as pd
 import numpy as np
-from .indicators import atr, ma
+from .indicators import compute_indicators
 from ..utils.formatters import safe_float
 
 
-def buy_zones(df: pd.DataFrame) -> dict:
+def buy_zones(df: pd.DataFrame, ind: dict = None) -> dict:
     """
     计算三个买入区间：保守、标准、激进
     基于 ATR 和 MA200 偏离度
+    ind: compute_indicators 的结果，传入时不再重复计算
     """
-    close = df["Close"].dropna().astype(float)
-    last = float(close.iloc[-1])
+    if ind is None:
+        ind = compute_indicators(df)
+    last = ind["Last"]
 
-    a = atr(df, 14)
-    a = safe_float(a)
+    a = safe_float(ind["ATR14"])
+    bands = zone_bands(last, a if a is not None else np.nan, ind["MA200"])
 
-    atr_pct = (a / last) if (a is not None and last > 0) else 0.0
+    return {
+        "ATR14": a,
+        "Last": last,
+        "Conservative": tuple(float(v) for v in bands["Conservative"]),
+        "Neutral": tuple(float(v) for v in bands["Neutral"]),
+        "Aggressive": tuple(float(v) for v in bands["Aggressive"])
+    }
 
-    # 带宽：至少 6% 或 1.8*ATR（两者取更大）
-    width = max((1.8 * a) if a is not None else 0.0, last * max(0.06, 1.2 * atr_pct))
 
-    # 中心：偏向"回调买"，价格越高于MA200，中心越往下
-    ma200 = ma(close, 200)
-    dev200 = ((last - ma200) / ma200) if pd.notna(ma200) else 0.0
-    center_disc = 0.10 + float(np.clip(dev200, -0.2, 0.2)) * 0.10
-    center_disc = float(np.clip(center_disc, 0.06, 0.18))
+def zone_bands(last, atr, ma200) -> dict:
+    """
+    买入区间带（标量或数组均可，数组时逐日/逐只计算）
+    ATR 缺失时带宽只按百分比计算，MA200 缺失时不做偏离修正
+    返回 {"Conservative": (lo, hi), "Neutral": (lo, hi), "Aggressive": (lo, hi)}
+    """
+    last = np.asarray(last, dtype=float)
+    a = np.asarray(atr, dtype=float)
+    a = np.where(np.isfinite(a), a, 0.0)
+    ma200 = np.asarray(ma200, dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atr_pct = np.where(last > 0, a / last, 0.0)
+
+        # 带宽：至少 6% 或 1.8*ATR（两者取更大）
+        width = np.maximum(1.8 * a, last * np.maximum(0.06, 1.2 * atr_pct))
+
+        # 中心：偏向"回调买"，价格越高于MA200，中心越往下
+        dev200 = np.where(np.isnan(ma200), 0.0, (last - ma200) / ma200)
+    center_disc = 0.10 + np.clip(dev200, -0.2, 0.2) * 0.10
+    center_disc = np.clip(center_disc, 0.06, 0.18)
     center = last * (1 - center_disc)
 
     conservative = (center + 0.6 * width, center + 1.2 * width)  # 更稳
@@ -35,16 +57,11 @@ def buy_zones(df: pd.DataFrame) -> dict:
     aggressive = (center - 1.2 * width, center - 0.6 * width)     # 抄底带
 
     def clamp(r):
-        lo, hi = r
-        lo = max(float(lo), 0.01)
-        hi = max(float(hi), 0.01)
-        if lo > hi:
-            lo, hi = hi, lo
-        return (lo, hi)
+        lo = np.maximum(r[0], 0.01)
+        hi = np.maximum(r[1], 0.01)
+        return (np.minimum(lo, hi), np.maximum(lo, hi))
 
     return {
-        "ATR14": a,
-        "Last": last,
         "Conservative": clamp(conservative),
         "Neutral": clamp(neutral),
         "Aggressive": clamp(aggressive)
@@ -0,0 +1,150 @@
+"""
+boot snapshot: popular tickers' price histories, fundamentals and finished
+/analyze responses, written to disk ahead of time and mapped on startup so the
+first requests after a scale-from-zero are served from memory
+
+    python -m app.snapshot [TICKER ...]    # build (default: SNAPSHOT_TICKERS)
+
+layout: prices.npy holds every history side by side as one (6, n) float64 matrix
+in the price store's row layout, mapped read-only (shared by all workers);
+manifest.json holds each ticker's column range, the fundamentals snapshots and
+the response bodies
+restored entries keep their age: a history that may have missed bars, or a
+snapshot past its TTL, is served immediately and refreshed in the background;
+one past its cache's hard TTL is not restored, nor are the responses built on it
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+import numpy as np
+from dotenv import load_dotenv
+from loguru import logger
+
+# when run as a script, load .env before modules that read configuration on import
+load_dotenv()
+
+from .core.rate_limit import BATCH, priority  # noqa: E402
+from .models.schemas import AnalysisRequest  # noqa: E402
+from .routers.analysis import cached_responses, run_analysis, seed_response  # noqa: E402
+from .services import price_store  # noqa: E402
+from .services.data_loader import cached_histories, price_cache, seed_price_cache  # noqa: E402
+from .services.fundamentals import fundamentals_cache, seed_fundamentals  # noqa: E402
+
+SNAPSHOT_DIR = Path(os.getenv(
+    "SNAPSHOT_DIR",
+    str(Path(__file__).resolve().parent / "data" / "snapshot")
+))
+SNAPSHOT_TICKERS = [t.strip() for t in os.getenv(
+    "SNAPSHOT_TICKERS", "AAPL,MSFT,NVDA,AMZN,GOOGL,META,TSLA,AVGO,SPY,QQQ"
+).split(",") if t.strip()]
+# histories are kept for the longest look-back the API accepts
+SNAPSHOT_YEARS = 15
+
+
+def _write_atomic(path: Path, write):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        write(fh)
+    os.replace(tmp, path)
+
+
+def dump(tickers: list, directory: Path = SNAPSHOT_DIR) -> int:
+    """write what the in-process caches hold for tickers; returns the number of histories"""
+    wanted = set(tickers)
+    histories = [(t, start, series) for t, start, series in cached_histories() if t in wanted]
+    if not histories:
+        logger.warning("Nothing cached for the requested tickers, snapshot not written")
+        return 0
+
+    manifest = {"built": time.time(), "prices": {}, "fundamentals": {}, "responses": []}
+    matrices, offset = [], 0
+    for ticker, start, series in histories:
+        matrices.append(price_store.to_matrix(series))
+        manifest["prices"][ticker] = {
+            "offset": offset, "length": len(series), "start": start,
+            "synced": price_store.synced_at(ticker) or time.time(),
+        }
+        offset += len(series)
+    for ticker, f, age in fundamentals_cache.items():
+        if ticker in wanted:
+            manifest["fundamentals"][ticker] = {"data": f, "fetched": time.time() - age}
+    for key, f, body, etag in cached_responses():
+        if key[0] in wanted and key[0] in manifest["fundamentals"]:
+            manifest["responses"].append({"key": list(key), "body": body.decode(), "etag": etag})
+    manifest["columns"] = offset
+
+    directory.mkdir(parents=True, exist_ok=True)
+    matrix = np.concatenate(matrices, axis=1)
+    _write_atomic(directory / "prices.npy", lambda fh: np.save(fh, matrix))
+    _write_atomic(directory / "manifest.json", lambda fh: fh.write(json.dumps(manifest).encode()))
+    logger.info(f"Wrote boot snapshot of {len(histories)} tickers "
+                f"({len(manifest['responses'])} responses, {matrix.nbytes / 1e6:.1f} MB) to {directory}")
+    return len(histories)
+
+
+def load(directory: Path = SNAPSHOT_DIR) -> dict:
+    """seed the in-process caches from the snapshot; returns what was restored"""
+    try:
+        with open(directory / "manifest.json") as fh:
+            manifest = json.load(fh)
+        matrix = np.load(directory / "prices.npy", mmap_mode="r")
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Failed to read boot snapshot in {directory}: {e}")
+        return {}
+    if matrix.shape != (1 + len(price_store.OHLCV_COLUMNS), manifest.get("columns")):
+        logger.warning(f"Boot snapshot in {directory} does not match its manifest, ignored")
+        return {}
+
+    now = time.time()
+    for ticker, p in manifest["prices"].items():
+        series = price_store.from_matrix(matrix[:, p["offset"]:p["offset"] + p["length"]])
+        seed_price_cache(ticker, p["start"], series, p["synced"])
+
+    snapshots = {}
+    for ticker, f in manifest["fundamentals"].items():
+        seed_fundamentals(ticker, f["data"], now - f["fetched"])
+        # responses are tied to the very snapshot object the fundamentals cache holds
+        snapshots[ticker] = fundamentals_cache.peek(ticker)
+
+    responses = 0
+    for r in manifest["responses"]:
+        key = tuple(r["key"])
+        # only with both inputs restored (either may have been too old)
+        if snapshots.get(key[0]) is not None and price_cache.peek(key[0]) is not None:
+            seed_response(key, snapshots[key[0]], r["body"].encode(), r["etag"])
+            responses += 1
+    return {"tickers": sum(price_cache.peek(t) is not None for t in manifest["prices"]), "responses": responses,
+            "age": now - manifest.get("built", now)}
+
+
+async def build(tickers: list, concurrency: int = 4, directory: Path = SNAPSHOT_DIR) -> int:
+    """run the default /analyze for each ticker (filling the caches), then dump them"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(ticker: str):
+        async with semaphore:
+            try:
+                # load the longest history first so the cache keeps the superset
+                request = AnalysisRequest(ticker=ticker, years=SNAPSHOT_YEARS)
+                await run_analysis(request)
+                await run_analysis(AnalysisRequest(ticker=ticker))
+            except Exception as e:
+                logger.warning(f"Skipping {ticker} in boot snapshot: {getattr(e, 'detail', e)}")
+
+    with priority(BATCH):
+        await asyncio.gather(*(warm(t) for t in dict.fromkeys(tickers)))
+    return dump(tickers, directory)
+
+
+def main(argv: list) -> int:
+    tickers = [t.upper() for t in argv] or SNAPSHOT_TICKERS
+    return 0 if asyncio.run(build(tickers)) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))